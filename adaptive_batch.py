@@ -0,0 +1,115 @@
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+
+class AdaptiveBatcher:
+    """
+    Hill-climbing batch size tuner
+
+    After every batch the caller reports how many rows it handled and how long it took.
+    The batcher keeps moving the size in the direction that improved rows/sec, reverses
+    (with a smaller step) when throughput drops, and never lets a batch grow past the
+    `max_bytes` memory ceiling estimated from the rows it has seen.
+
+    Usage:
+        batcher = AdaptiveBatcher(initial_size=1000)
+        while batch := cursor.fetchmany(batcher.size):
+            start = time.perf_counter()
+            write(batch)
+            batcher.record(batch, time.perf_counter() - start)
+    """
+
+    def __init__(
+        self,
+        initial_size: int = 1000,
+        min_size: int = 100,
+        max_size: int = 100_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        growth: float = 2.0,
+        min_growth: float = 1.1,
+        tolerance: float = 0.05,
+        name: str = "batch",
+        verbose: bool = False,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.growth = growth
+        self.min_growth = min_growth
+        self.tolerance = tolerance
+        self.name = name
+        self.verbose = verbose
+
+        self.size = max(min_size, min(initial_size, max_size))
+        self.row_bytes: Optional[int] = None
+        self.history: List[Tuple[int, float]] = []
+        self.best: Optional[Tuple[int, float]] = None
+        self._direction = 1
+        self._last_rps: Optional[float] = None
+
+    @staticmethod
+    def estimate_row_bytes(rows: Sequence, sample: int = 20) -> int:
+        """Approximate in-memory size of one row from the first `sample` rows"""
+        sampled = rows[:sample]
+        if not sampled:
+            return 0
+        total = 0
+        for row in sampled:
+            total += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        return total // len(sampled)
+
+    @property
+    def memory_limit(self) -> int:
+        """Largest batch size that fits under `max_bytes` for the rows seen so far"""
+        if not self.row_bytes:
+            return self.max_size
+        return max(self.min_size, self.max_bytes // self.row_bytes)
+
+    def record(self, rows, elapsed: float) -> int:
+        """
+        Report a finished batch and return the size to use for the next one
+
+        Args:
+            rows: The batch itself (used to estimate row width) or its row count
+            elapsed: Seconds spent handling the batch
+
+        Returns:
+            Next batch size
+        """
+        count = rows if isinstance(rows, int) else len(rows)
+        if not isinstance(rows, int) and count:
+            self.row_bytes = self.estimate_row_bytes(rows)
+
+        # A short batch means the source ran dry; its timing says nothing about the size
+        if count < self.size or elapsed <= 0:
+            return self.size
+
+        rps = count / elapsed
+        self.history.append((self.size, rps))
+        if self.best is None or rps > self.best[1]:
+            self.best = (self.size, rps)
+
+        if self._last_rps is not None and rps < self._last_rps * (1 - self.tolerance):
+            # Got worse: turn around and take smaller steps
+            self._direction = -self._direction
+            self.growth = max(self.min_growth, self.growth ** 0.5)
+        elif rps < self.best[1] * (1 - self.tolerance):
+            # Slowly drifting away from the best size seen: head back toward it
+            self._direction = 1 if self.best[0] > self.size else -1
+            self.growth = max(self.min_growth, self.growth ** 0.5)
+        self._last_rps = rps
+
+        new_size = int(self.size * self.growth) if self._direction > 0 else int(self.size / self.growth)
+        new_size = max(self.min_size, min(new_size, self.max_size, self.memory_limit))
+        if self.verbose and new_size != self.size:
+            print(f"[{self.name}] batch size {self.size} -> {new_size} ({rps:,.0f} rows/sec)", flush=True)
+        self.size = new_size
+        return self.size
+
+    def summary(self) -> str:
+        """One-line description of what the batcher converged to"""
+        if self.best is None:
+            return f"[{self.name}] batch size {self.size} (not enough full batches to tune)"
+        best_size, best_rps = self.best
+        return (f"[{self.name}] converged to batch size {self.size} "
+                f"(best {best_size} at {best_rps:,.0f} rows/sec over {len(self.history)} batches)")
@@ -0,0 +1,230 @@
+import sys
+import time
+import json
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, Tuple, Union
+from rich import print
+from db import get_async_engine, dispose_async_engines, cached_text
+from row_formats import check_row_format, format_rows
+from paging import (
+    COUNT_STRATEGIES, PaginationResult, count_key, cached_total, store_total,
+    offset_page_query, default_count_query, window_page_query, split_window_rows,
+)
+
+# A query for gather(): SQL, (SQL, params), or any awaitable
+QuerySpec = Union[str, Tuple[str, Optional[Dict]], Awaitable]
+
+
+async def fetch_one(query: str, params: Optional[Dict] = None, row_format: str = 'dict') -> Optional[Any]:
+    """
+    Fetch a single row from a query (async)
+
+    Args:
+        query: SQL query string
+        params: Optional query parameters
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+
+    Returns:
+        The first row of results in the requested format, or None if no results
+    """
+    check_row_format(row_format)
+    async with get_async_engine().connect() as conn:
+        result = await conn.execute(cached_text(query), params or {})
+        row = result.fetchone()
+        if not row:
+            return None
+        return format_rows(list(result.keys()), [row], row_format)[0]
+
+
+async def fetch_all(query: str, params: Optional[Dict] = None, row_format: str = 'dict') -> List[Any]:
+    """
+    Fetch all rows from a query (async)
+
+    Args:
+        query: SQL query string
+        params: Optional query parameters
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+
+    Returns:
+        List of rows in the requested format (dictionaries by default)
+    """
+    check_row_format(row_format)
+    async with get_async_engine().connect() as conn:
+        result = await conn.execute(cached_text(query), params or {})
+        return format_rows(list(result.keys()), result.fetchall(), row_format)
+
+
+async def estimate_count(query: str, params: Optional[Dict] = None) -> int:
+    """Planner row estimate for a query (no table scan)"""
+    row = await fetch_one(f"EXPLAIN (FORMAT JSON) {query}", params, row_format='tuple')
+    plan = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+async def _count(count_query: str, params: Optional[Dict]) -> int:
+    return (await fetch_one(count_query, params, row_format='tuple'))[0]
+
+
+async def paginate_query(
+    query: str,
+    page: int = 1,
+    per_page: int = 100,
+    params: Optional[Dict] = None,
+    count_query: Optional[str] = None,
+    count_strategy: str = 'exact',
+    count_ttl: float = 60.0,
+    row_format: str = 'dict'
+) -> PaginationResult:
+    """
+    Execute a paginated query (async)
+
+    Same arguments and result as main.paginate_query. For 'exact', 'estimate' and a
+    'cached' miss, the page and the total are fetched concurrently on two connections,
+    so the call takes as long as the slower of the two instead of their sum.
+
+    Returns:
+        PaginationResult object with items and pagination info
+    """
+    if count_strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Unknown count strategy: {count_strategy}")
+    check_row_format(row_format)
+
+    page = max(page, 1)
+    offset = (page - 1) * per_page
+    if not count_query:
+        count_query = default_count_query(query)
+
+    total_is_exact = True
+    if count_strategy == 'window':
+        # Page and total in one statement; the window is computed before LIMIT/OFFSET
+        rows = await fetch_all(window_page_query(query, per_page, offset), params, row_format='row')
+        items, total = split_window_rows(rows, row_format)
+        if total is None:
+            total = await _count(count_query, params)
+    else:
+        page_query = fetch_all(offset_page_query(query, per_page, offset), params, row_format=row_format)
+        cache_key = count_key(count_query, params)
+        total = cached_total(cache_key) if count_strategy == 'cached' else None
+        if total is not None:
+            items = await page_query
+        elif count_strategy == 'estimate':
+            items, total = await asyncio.gather(page_query, estimate_count(query, params))
+            total_is_exact = False
+        else:
+            items, total = await asyncio.gather(page_query, _count(count_query, params))
+            if count_strategy == 'cached':
+                store_total(cache_key, total, count_ttl)
+
+    return PaginationResult(
+        items=items,
+        total=total,
+        page=page,
+        per_page=per_page,
+        total_pages=(total + per_page - 1) // per_page,
+        total_is_exact=total_is_exact
+    )
+
+
+async def gather(*queries: QuerySpec, row_format: str = 'dict', return_exceptions: bool = False) -> List[Any]:
+    """
+    Run independent queries at the same time, each on its own pooled connection
+
+    Total latency is that of the slowest query rather than the sum of all of them.
+    Concurrency is bounded by the async engine's pool (pool_size + max_overflow).
+
+    Args:
+        queries: SQL strings and (SQL, params) tuples (run with fetch_all), or any
+                 awaitables such as paginate_query(...) or fetch_one(...)
+        row_format: Row format for the SQL queries
+        return_exceptions: Return exceptions in place of results instead of raising the first
+
+    Returns:
+        Results in the order the queries were given
+    """
+    awaitables = []
+    for spec in queries:
+        if isinstance(spec, str):
+            awaitables.append(fetch_all(spec, row_format=row_format))
+        elif isinstance(spec, tuple):
+            awaitables.append(fetch_all(spec[0], spec[1], row_format=row_format))
+        else:
+            awaitables.append(spec)
+    return await asyncio.gather(*awaitables, return_exceptions=return_exceptions)
+
+
+def run(awaitable: Awaitable) -> Any:
+    """Run a coroutine from synchronous code and close its connections afterwards"""
+    async def runner():
+        try:
+            return await awaitable
+        finally:
+            await dispose_async_engines()
+    return asyncio.run(runner())
+
+
+async def benchmark_concurrency(queries: Sequence[str]) -> Dict[str, float]:
+    """Time the queries one after another, then all at once with gather()"""
+    # Open the pool's connections first so neither run pays for connecting
+    await gather(*["SELECT 1"] * len(queries))
+
+    start_time = time.perf_counter()
+    for query in queries:
+        await fetch_all(query, row_format='tuple')
+    sequential = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    await gather(*queries, row_format='tuple')
+    concurrent = time.perf_counter() - start_time
+
+    print(f"{len(queries)} queries")
+    print(f"Sequential: {sequential:.4f} seconds")
+    print(f"gather():   {concurrent:.4f} seconds")
+    print(f"Concurrent is {sequential / concurrent:.2f}x faster")
+    return {'sequential': sequential, 'concurrent': concurrent}
+
+
+async def self_check() -> None:
+    """
+    Exercise fetch/pagination/gather against the configured PostgreSQL database
+
+    Uses generate_series only, so no tables are needed; raises AssertionError on the
+    first mismatch.
+    """
+    series = "SELECT n, n * 2 AS double FROM generate_series(1, 25) AS n ORDER BY n DESC"
+
+    assert await fetch_one("SELECT 1 AS one") == {'one': 1}
+    assert await fetch_one("SELECT 1 WHERE false") is None
+    for row_format in ('dict', 'tuple', 'row', 'record'):
+        rows = await fetch_all(series, row_format=row_format)
+        assert len(rows) == 25 and tuple(rows[0] if row_format != 'dict' else rows[0].values()) == (25, 50), row_format
+
+    for count_strategy in COUNT_STRATEGIES:
+        for row_format in ('dict', 'tuple', 'row', 'record'):
+            page = await paginate_query(series, page=2, per_page=10, count_strategy=count_strategy,
+                                        row_format=row_format)
+            values = [tuple(item.values()) if row_format == 'dict' else tuple(item) for item in page.items]
+            assert values == [(n, n * 2) for n in range(15, 5, -1)], (count_strategy, row_format, values)
+            if count_strategy != 'estimate':
+                assert (page.total, page.total_pages, page.total_is_exact) == (25, 3, True), count_strategy
+        past_end = await paginate_query(series, page=9, per_page=10, count_strategy=count_strategy)
+        assert past_end.items == [], count_strategy
+    assert cached_total(count_key(default_count_query(series))) == 25
+
+    one, many, page = await gather("SELECT 1 AS one", (series, None),
+                                   paginate_query(series, per_page=5))
+    assert one == [{'one': 1}] and len(many) == 25 and page.items[0] == {'n': 25, 'double': 50}
+    errors = await gather("SELECT 1 AS one", "SELECT * FROM no_such_table", return_exceptions=True)
+    assert errors[0] == [{'one': 1}] and isinstance(errors[1], Exception)
+    print("[green]async_db check passed[/green]")
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv[1:]:
+        run(self_check())
+        sys.exit(0)
+    run(benchmark_concurrency([
+        "SELECT * FROM asset_master ORDER BY timestamp DESC LIMIT 1000",
+        "SELECT * FROM asset_total_history_report ORDER BY timestamp DESC LIMIT 1000",
+        "SELECT COUNT(*) FROM asset_master",
+        "SELECT COUNT(*) FROM asset_total_history_report",
+    ]))
@@ -0,0 +1,164 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+from rich import print
+
+
+class BatchLoader:
+    """
+    DataLoader-style batching of point lookups
+
+    Keys requested with load() are collected for `wait` seconds (or until
+    `max_batch_size` keys are pending) and resolved together by one call to
+    `batch_fn(keys) -> {key: value}`, so N concurrent lookups cost one round trip.
+    load_many() resolves an explicit list of keys immediately in a single batch.
+    Keys missing from the returned dictionary resolve to None.
+
+    With cache=True each key is fetched at most once per loader; create a loader per
+    request/refresh, or call clear(), to see new data.
+
+    Usage:
+        loader = BatchLoader(lambda names: fetch_latest_by_key('asset_master', 'asset_name', names))
+        btc = loader.load('BTC')               # batched with other threads' loads
+        rows = loader.load_many(['BTC', 'ETH'])
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        max_batch_size: int = 500,
+        wait: float = 0.002,
+        cache: bool = True,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.wait = wait
+        self.batches = 0
+        self.keys_loaded = 0
+        self._cache: Optional[Dict[Hashable, Future]] = {} if cache else None
+        self._pending: Dict[Hashable, Future] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def load(self, key: Hashable) -> Any:
+        """Value for one key, fetched together with every other key requested in the same window"""
+        return self._future(key).result()
+
+    def load_many(self, keys: Sequence[Hashable]) -> List[Any]:
+        """Values for many keys (in order) in one batch, without waiting for the window"""
+        futures = [self._future(key, schedule=False) for key in keys]
+        self.dispatch()
+        return [future.result() for future in futures]
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Seed the cache with a value that is already known"""
+        if self._cache is None:
+            return
+        future = Future()
+        future.set_result(value)
+        with self._lock:
+            self._cache.setdefault(key, future)
+
+    def clear(self, key: Optional[Hashable] = None) -> None:
+        """Forget a cached key, or every cached key"""
+        if self._cache is None:
+            return
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def dispatch(self) -> None:
+        """Resolve every pending key now with one batch_fn call per max_batch_size keys"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            self._run_batch({key: pending[key] for key in keys[start:start + self.max_batch_size]})
+
+    def _future(self, key: Hashable, schedule: bool = True) -> Future:
+        full = False
+        with self._lock:
+            future = self._cache.get(key) if self._cache is not None else None
+            if future is None:
+                future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+                if self._cache is not None:
+                    self._cache[key] = future
+                if len(self._pending) >= self.max_batch_size:
+                    full = True
+                elif schedule and self._timer is None:
+                    self._timer = threading.Timer(self.wait, self.dispatch)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if full:
+            self.dispatch()
+        return future
+
+    def _run_batch(self, batch: Dict[Hashable, Future]) -> None:
+        try:
+            results = self.batch_fn(list(batch))
+        except Exception as error:
+            # Failed keys are not cached, so a later load retries them
+            if self._cache is not None:
+                with self._lock:
+                    for key in batch:
+                        if self._cache.get(key) is batch[key]:
+                            del self._cache[key]
+            for future in batch.values():
+                future.set_exception(error)
+            return
+        with self._lock:
+            self.batches += 1
+            self.keys_loaded += len(batch)
+        for key, future in batch.items():
+            future.set_result(results.get(key))
+
+
+def asset_loader(row_format: str = 'dict', **kwargs) -> BatchLoader:
+    """BatchLoader for the latest asset_master row per asset_name"""
+    from main import fetch_latest_by_key
+    return BatchLoader(
+        lambda names: fetch_latest_by_key('asset_master', 'asset_name', names, row_format=row_format),
+        **kwargs
+    )
+
+
+def benchmark_point_lookups(names: Optional[Sequence[str]] = None, threads: int = 16) -> Dict[str, float]:
+    """Compare one fetch_one per asset with batched lookups (explicit and windowed)"""
+    from main import fetch_all, fetch_one
+
+    if names is None:
+        names = [row['asset_name'] for row in fetch_all("SELECT DISTINCT asset_name FROM asset_master", use_cache=False)]
+    query = "SELECT * FROM asset_master WHERE asset_name = :asset_name ORDER BY timestamp DESC"
+
+    start_time = time.perf_counter()
+    for name in names:
+        fetch_one(query, {"asset_name": name}, use_cache=False)
+    one_by_one = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    asset_loader().load_many(names)
+    explicit = time.perf_counter() - start_time
+
+    loader = asset_loader()
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(loader.load, names))
+    windowed = time.perf_counter() - start_time
+
+    print(f"{len(names)} assets")
+    print(f"fetch_one per asset:  {one_by_one:.4f} seconds ({len(names)} round trips)")
+    print(f"load_many:            {explicit:.4f} seconds (1 round trip)")
+    print(f"load from {threads} threads: {windowed:.4f} seconds ({loader.batches} round trips)")
+    return {'one_by_one': one_by_one, 'load_many': explicit, 'windowed': windowed}
+
+
+if __name__ == "__main__":
+    benchmark_point_lookups()
@@ -0,0 +1,293 @@
+import os
+import sys
+import math
+import json
+import time
+import platform
+import argparse
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from statistics import NormalDist, mean, median, stdev
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from rich import print
+from db import get_engine, dispose_engines, cached_text
+from row_formats import check_row_format, format_rows
+
+# Phases a query benchmark times separately
+QUERY_PHASES = ('engine', 'connect', 'execute', 'fetch', 'decode')
+
+QUANTILES = {'median': 0.5, 'p95': 0.95, 'p99': 0.99}
+CONFIDENCE = 0.95
+
+# compare: a phase changed if its median moved by more than this fraction and the
+# confidence intervals of the two medians do not overlap
+DEFAULT_THRESHOLD = 0.05
+
+
+class PhaseTimer:
+    """Per-iteration phase timings in nanoseconds (time.perf_counter_ns)"""
+
+    def __init__(self):
+        self.phases: Dict[str, int] = {}
+        self.extra: Dict[str, Any] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter_ns() - start
+
+
+def quantile_ci(sorted_samples: Sequence[float], q: float, confidence: float = CONFIDENCE) -> Dict[str, float]:
+    """
+    Sample quantile with a distribution-free confidence interval
+
+    The interval bounds are order statistics whose ranks come from the normal
+    approximation to the binomial distribution of the number of samples below the
+    true quantile, so no assumption about the latency distribution is needed. With few
+    samples the tail intervals reach the smallest/largest sample; with none, every value is NaN.
+    """
+    n = len(sorted_samples)
+    if n == 0:
+        nan = float('nan')
+        return {'value': nan, 'ci_low': nan, 'ci_high': nan}
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_width = z * math.sqrt(n * q * (1 - q))
+    lower = max(0, math.floor(n * q - half_width) - 1)
+    upper = min(n - 1, math.ceil(n * q + half_width))
+    value = sorted_samples[min(n - 1, max(0, math.ceil(n * q) - 1))]
+    return {'value': value, 'ci_low': sorted_samples[lower], 'ci_high': sorted_samples[upper]}
+
+
+def summarize(samples_ns: Sequence[int]) -> Dict[str, Any]:
+    """Median/p95/p99 with confidence intervals, plus mean/stdev/min/max, in milliseconds"""
+    values = sorted(ns / 1e6 for ns in samples_ns)
+    summary: Dict[str, Any] = {name: quantile_ci(values, q) for name, q in QUANTILES.items()}
+    if not values:
+        # e.g. iterations=0: every statistic is NaN
+        summary.update(mean=float('nan'), stdev=float('nan'), min=float('nan'), max=float('nan'), n=0)
+        return summary
+    summary['median']['value'] = median(values)
+    summary.update(
+        mean=mean(values),
+        stdev=stdev(values) if len(values) > 1 else 0.0,
+        min=values[0],
+        max=values[-1],
+        n=len(values),
+    )
+    return summary
+
+
+def measure(name: str, fn: Callable[[PhaseTimer], None], iterations: int = 30, warmup: int = 3,
+            metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run `fn` for `warmup` unrecorded and `iterations` recorded iterations
+
+    `fn` receives a PhaseTimer and wraps each part of its work in timer.phase(name);
+    the wall time of the whole call is recorded as the 'total' phase. Anything it puts
+    in timer.extra (e.g. rows) is taken from the last iteration.
+
+    Returns:
+        {'name', 'iterations', 'warmup', 'metadata', 'extra', 'phases': {phase: summary},
+         'samples_ns': {phase: [...]}}
+
+    Raises:
+        ValueError: if iterations < 1 (there would be nothing to report)
+    """
+    if iterations < 1:
+        raise ValueError(f"iterations must be at least 1, got {iterations}")
+    for _ in range(warmup):
+        fn(PhaseTimer())
+
+    samples: Dict[str, List[int]] = {}
+    timer = PhaseTimer()
+    for _ in range(iterations):
+        timer = PhaseTimer()
+        start = time.perf_counter_ns()
+        fn(timer)
+        timer.phases['total'] = time.perf_counter_ns() - start
+        for phase, ns in timer.phases.items():
+            samples.setdefault(phase, []).append(ns)
+
+    return {
+        'name': name,
+        'iterations': iterations,
+        'warmup': warmup,
+        'metadata': metadata or {},
+        'extra': timer.extra,
+        'phases': {phase: summarize(values) for phase, values in samples.items()},
+        'samples_ns': samples,
+    }
+
+
+def query_case(query: str, params: Optional[Dict] = None, row_format: str = 'dict', stream: bool = False,
+               chunk_size: int = 10_000, new_connection: bool = False) -> Callable[[PhaseTimer], None]:
+    """
+    Benchmark body for one query, timing engine lookup, connect, execute, fetch and decode
+
+    Args:
+        query: SQL query string
+        params: Query parameters
+        row_format: Format rows are decoded into
+        stream: Fetch through a server-side cursor in chunks of `chunk_size`
+        new_connection: Dispose the pool first so 'engine' includes engine creation and
+                        'connect' the TCP/TLS handshake
+    """
+    check_row_format(row_format)
+
+    def run(timer: PhaseTimer) -> None:
+        if new_connection:
+            dispose_engines()
+        with timer.phase('engine'):
+            engine = get_engine()
+        with timer.phase('connect'):
+            conn = engine.connect()
+        try:
+            with timer.phase('execute'):
+                if stream:
+                    conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+                result = conn.execute(cached_text(query), params or {})
+                columns = list(result.keys())
+            rows = 0
+            while True:
+                with timer.phase('fetch'):
+                    batch = result.fetchmany(chunk_size) if stream else result.fetchall()
+                if not batch:
+                    break
+                with timer.phase('decode'):
+                    format_rows(columns, batch, row_format)
+                rows += len(batch)
+                if not stream:
+                    break
+            timer.extra['rows'] = rows
+        finally:
+            conn.close()
+    return run
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Where the results came from (database password and user are not recorded)"""
+    url = get_engine().url
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'database': {'backend': url.get_backend_name(), 'driver': url.get_driver_name(),
+                     'host': url.host, 'port': url.port, 'database': url.database},
+    }
+
+
+def write_results(results: Sequence[Dict[str, Any]], path: str, keep_samples: bool = True) -> None:
+    """Write benchmark results and their environment as JSON"""
+    benchmarks = [r if keep_samples else {k: v for k, v in r.items() if k != 'samples_ns'} for r in results]
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'benchmarks': benchmarks}, f, indent=2, default=str)
+    print(f"Results written to {path}")
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """One line per phase: median [CI], p95, p99 in milliseconds"""
+    rows = result['extra'].get('rows')
+    print(f"\n=== {result['name']} ({result['iterations']} iterations, {result['warmup']} warm-up"
+          + (f", {rows:,} rows" if rows is not None else '') + ") ===")
+    for phase, summary in result['phases'].items():
+        med = summary['median']
+        print(f"{phase:>8}: median {med['value']:10.3f} ms [{med['ci_low']:.3f}, {med['ci_high']:.3f}]"
+              f"  p95 {summary['p95']['value']:10.3f}  p99 {summary['p99']['value']:10.3f}")
+
+
+def compare_results(base_path: str, new_path: str, threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare the phase medians of two result files
+
+    A phase is a regression (or improvement) when its median moved by more than
+    `threshold` and the 95% confidence intervals of the two medians do not overlap.
+
+    Returns:
+        One entry per benchmark/phase present in both files; 'status' is
+        'regression', 'improvement' or 'unchanged'
+    """
+    with open(base_path) as f:
+        base = {b['name']: b for b in json.load(f)['benchmarks']}
+    with open(new_path) as f:
+        new = {b['name']: b for b in json.load(f)['benchmarks']}
+
+    changes = []
+    for name in base.keys() & new.keys():
+        for phase in base[name]['phases'].keys() & new[name]['phases'].keys():
+            old_median = base[name]['phases'][phase]['median']
+            new_median = new[name]['phases'][phase]['median']
+            ratio = new_median['value'] / old_median['value'] if old_median['value'] else float('inf')
+            status = 'unchanged'
+            if ratio > 1 + threshold and new_median['ci_low'] > old_median['ci_high']:
+                status = 'regression'
+            elif ratio < 1 - threshold and new_median['ci_high'] < old_median['ci_low']:
+                status = 'improvement'
+            changes.append({'benchmark': name, 'phase': phase, 'base_ms': old_median['value'],
+                            'new_ms': new_median['value'], 'ratio': ratio, 'status': status})
+    changes.sort(key=lambda c: (c['benchmark'], c['phase']))
+    return changes
+
+
+def print_comparison(changes: Sequence[Dict[str, Any]]) -> None:
+    colors = {'regression': 'red', 'improvement': 'green', 'unchanged': 'dim'}
+    for change in changes:
+        color = colors[change['status']]
+        print(f"[{color}]{change['status']:>11}[/{color}]  {change['benchmark']} / {change['phase']}: "
+              f"{change['base_ms']:.3f} -> {change['new_ms']:.3f} ms ({(change['ratio'] - 1) * 100:+.1f}%)")
+    regressions = sum(c['status'] == 'regression' for c in changes)
+    print(f"\n{regressions} regression(s), "
+          f"{sum(c['status'] == 'improvement' for c in changes)} improvement(s), {len(changes)} phases compared")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query benchmark harness")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark SELECT * ... LIMIT n on each table")
+    run_parser.add_argument("--tables", nargs='+', default=['asset_master', 'asset_total_history_report'])
+    run_parser.add_argument("--limit", type=int, default=1000)
+    run_parser.add_argument("--iterations", type=int, default=30)
+    run_parser.add_argument("--warmup", type=int, default=3)
+    run_parser.add_argument("--row-format", default='dict')
+    run_parser.add_argument("--stream", action="store_true", help="fetch through a server-side cursor")
+    run_parser.add_argument("--new-connection", action="store_true",
+                            help="open a new connection every iteration (connect includes the handshake)")
+    run_parser.add_argument("--output", default="bench-results.json")
+
+    compare_parser = commands.add_parser("compare", help="show regressions between two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        results = []
+        for table in args.tables:
+            query = f"SELECT * FROM {table} LIMIT {args.limit}"
+            result = measure(
+                f"{table} limit={args.limit}" + (" stream" if args.stream else ""),
+                query_case(query, row_format=args.row_format, stream=args.stream, new_connection=args.new_connection),
+                iterations=args.iterations, warmup=args.warmup,
+                metadata={'query': query, 'row_format': args.row_format, 'stream': args.stream,
+                          'new_connection': args.new_connection},
+            )
+            print_result(result)
+            results.append(result)
+        write_results(results, args.output)
+    else:
+        changes = compare_results(args.base, args.new, args.threshold)
+        print_comparison(changes)
+        sys.exit(1 if any(c['status'] == 'regression' for c in changes) else 0)
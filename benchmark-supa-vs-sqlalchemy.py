@@ -1,8 +1,10 @@
 import os
-import time
 import pprint
-from sqlalchemy import create_engine, text, MetaData
+from typing import Optional
+from sqlalchemy import text, MetaData
 from dotenv import load_dotenv
+from db import get_engine
+from bench import PhaseTimer, measure, query_case, print_result, write_results
 from supabase import create_client, Client
 
 # Load environment variables from .env file
@@ -11,15 +13,16 @@ CONNECTION_STRING = os.getenv('DATABASE_URL')
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
-if not all([CONNECTION_STRING, SUPABASE_URL, SUPABASE_KEY]):
-    raise ValueError("Required environment variables not found. Please check DATABASE_URL, SUPABASE_URL, and SUPABASE_KEY")
+if not CONNECTION_STRING:
+    raise ValueError("Required environment variables not found. Please check DATABASE_URL")
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Initialize Supabase client (without SUPABASE_URL/SUPABASE_KEY, e.g. against a generate-dataset.py database,
+# only the SQLAlchemy side is benchmarked)
+supabase: Optional[Client] = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
 
 def get_table_info():
     # Create an engine
-    engine = create_engine(CONNECTION_STRING)
+    engine = get_engine()
     conn = engine.connect()
     
     # 메타데이터 객체 생성 및 리플렉션
@@ -91,7 +94,7 @@ def get_table_info():
     get_object_schema("asset_total_history_report")
 
 def conn_db_and_exec_query(stmt):
-    engine = create_engine(CONNECTION_STRING)    
+    engine = get_engine()
     with engine.connect() as conn:
         result_set = conn.execute(text(stmt))
         return result_set
@@ -151,7 +154,7 @@ def use_case_02():
 
 
 def use_case_03():
-    engine = create_engine(CONNECTION_STRING) 
+    engine = get_engine()
     with engine.connect() as connection:
         # Build the select query
         select_query = """
@@ -176,70 +179,64 @@ def use_case_03():
             print(", ".join(f"{col}: {row_dict[col]}" for col in last_two_columns))
 
 
-def benchmark_sqlalchemy_query(table_name: str, limit: int = 1000) -> dict:
-    """Execute a simple SELECT query using SQLAlchemy and return timing information."""
-    start_time = time.time()
-    
-    engine = create_engine(CONNECTION_STRING)
-    with engine.connect() as conn:
-        # Simple select query
-        query = f"SELECT * FROM {table_name} LIMIT {limit}"
-        result = conn.execute(text(query))
-        rows = result.fetchall()
-        print(table_name, "rows", len(rows))
-    
-    end_time = time.time()
-    
+def benchmark_sqlalchemy_query(table_name: str, limit: int = 1000, iterations: int = 10, warmup: int = 1) -> dict:
+    """Time a simple SELECT query using SQLAlchemy (engine/connect/execute/fetch/decode phases)."""
+    query = f"SELECT * FROM {table_name} LIMIT {limit}"
+    result = measure(f"SQLAlchemy {table_name} limit={limit}", query_case(query, row_format='dict'),
+                     iterations=iterations, warmup=warmup, metadata={'method': 'SQLAlchemy', 'query': query})
     return {
         'method': 'SQLAlchemy',
-        'execution_time': end_time - start_time,
-        'rows_returned': len(rows),
+        'execution_time': result['phases']['total']['median']['value'] / 1000,
+        'rows_returned': result['extra']['rows'],
         'table': table_name,
-        'limit': limit
+        'limit': limit,
+        'benchmark': result,
     }
 
-def benchmark_supabase_query(table_name: str, limit: int = 1000) -> dict:
-    """Execute a simple SELECT query using Supabase client and return timing information."""
-    start_time = time.time()
-    
-    # Using Supabase client to fetch data
-    response = supabase.table(table_name).select('*').limit(limit).execute()
-    rows = response.data if hasattr(response, 'data') else []
-    print(table_name, "rows", len(rows))  
+def benchmark_supabase_query(table_name: str, limit: int = 1000, iterations: int = 10, warmup: int = 1) -> dict:
+    """Time a simple SELECT query using Supabase client (execute = HTTP request, decode = response data)."""
+    def run(timer: PhaseTimer) -> None:
+        with timer.phase('execute'):
+            response = supabase.table(table_name).select('*').limit(limit).execute()
+        with timer.phase('decode'):
+            rows = response.data if hasattr(response, 'data') else []
+        timer.extra['rows'] = len(rows)
 
-    end_time = time.time()
-    
+    result = measure(f"Supabase {table_name} limit={limit}", run, iterations=iterations, warmup=warmup,
+                     metadata={'method': 'Supabase', 'table': table_name, 'limit': limit})
     return {
         'method': 'Supabase',
-        'execution_time': end_time - start_time,
-        'rows_returned': len(rows),
+        'execution_time': result['phases']['total']['median']['value'] / 1000,
+        'rows_returned': result['extra']['rows'],
         'table': table_name,
-        'limit': limit
+        'limit': limit,
+        'benchmark': result,
     }
 
-def run_benchmarks(limit: int = 900):
-    """Run benchmarks for both SQLAlchemy and Supabase clients."""
+def run_benchmarks(limit: int = 900, iterations: int = 10, warmup: int = 1, output: str = None):
+    """Run benchmarks for both SQLAlchemy and Supabase clients (medians of `iterations` runs)."""
     tables = ['asset_master', 'asset_total_history_report']
     results = []
     
     for table in tables:
         print("")
         try:
-            # Warm-up run (not measured)
-            benchmark_sqlalchemy_query(table, limit=1)
-            benchmark_supabase_query(table, limit=1)
+            # supabase client 를 이용하면 아무리 큰 limit 를 주더라도 1000개까지만 가져옴. 따라서 주의해야한다. 제대로 비교할려면 양 쪽 케이스 모두를 1000으로 설정해야한다.
+            sqlalchemy_result = benchmark_sqlalchemy_query(table, limit=limit, iterations=iterations, warmup=warmup)
+            results.append(sqlalchemy_result)
+            print_result(sqlalchemy_result['benchmark'])
+            if supabase is None:
+                continue
+            supabase_result = benchmark_supabase_query(table, limit=limit, iterations=iterations, warmup=warmup)
+            results.append(supabase_result)
+            print_result(supabase_result['benchmark'])
             
-            # Actual benchmark runs
-            sqlalchemy_result = benchmark_sqlalchemy_query(table, limit=limit)
-            supabase_result = benchmark_supabase_query(table, limit=limit) # supabase client 를 이용하면 아무리 큰 limit 를 주더라도 1000개까지만 가져옴. 따라서 주의해야한다. 제대로 비교할려면 양 쪽 케이스 모두를 1000으로 설정해야한다.
-            results.extend([sqlalchemy_result, supabase_result])
-            
-            # Calculate and print comparison
+            # Calculate and print comparison of the median totals
             faster = 'SQLAlchemy' if sqlalchemy_result['execution_time'] < supabase_result['execution_time'] else 'Supabase'
             time_diff = abs(sqlalchemy_result['execution_time'] - supabase_result['execution_time'])
             percentage = (time_diff / min(sqlalchemy_result['execution_time'], supabase_result['execution_time'])) * 100
             
-            print(f"=== {table} Benchmark Results ===")
+            print(f"=== {table} Benchmark Results (median of {iterations}) ===")
             print(f"SQLAlchemy: {sqlalchemy_result['execution_time']:.4f} seconds")
             print(f"Supabase:   {supabase_result['execution_time']:.4f} seconds")
             print(f"{faster} is {percentage:.2f}% faster")
@@ -247,6 +244,9 @@ def run_benchmarks(limit: int = 900):
         except Exception as e:
             print(f"Error benchmarking table {table}: {str(e)}")
     
+    if output and results:
+        write_results([result['benchmark'] for result in results], output)
+    
     return results
 
 if __name__ == "__main__":
@@ -1,9 +1,8 @@
 # PostgreSQ
 import pandas as pd
 import streamlit as st
-import os
-from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from db import get_engine as get_shared_engine
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 
@@ -43,30 +42,42 @@ st.markdown("""
 # Database connection
 @st.cache_resource
 def get_engine():
-    conn_str = os.getenv('DATABASE_URL')
-    if not conn_str:
+    try:
+        engine = get_shared_engine()
+    except ValueError:
         st.error("DATABASE_URL not found in environment variables")
         st.stop()
-    return create_engine(conn_str)
+    return engine
+
+# Query helpers, set up once per process:
+# 여러 세션이 동시에 새로고침해도 같은 쿼리는 DB에서 한 번만 실행
+@st.cache_resource
+def enable_query_sharing():
+    get_engine()
+    from main import enable_single_flight
+    return enable_single_flight()
+
+enable_query_sharing()
 
 # Fetch data
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def fetch_asset_history(days):
     start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
     
-    with get_engine().connect() as conn:
-        # Fetch all data points for the selected date range
-        query = f"""
-            SELECT timestamp, total
-            FROM asset_total_history_report 
-            WHERE timestamp >= '{start_date}'
-            ORDER BY timestamp
-        """
-        df = pd.read_sql_query(query, conn)
+    from main import fetch_columnar
+
+    # Fetch all data points for the selected date range as typed columns (no per-row objects)
+    query = """
+        SELECT timestamp, total
+        FROM asset_total_history_report 
+        WHERE timestamp >= :start_date
+        ORDER BY timestamp
+    """
+    df = fetch_columnar(query, {'start_date': start_date}, backend='pandas')
     
     if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.set_index('timestamp')
+        # The frame may be shared with concurrent sessions, so build a new one instead of mutating it
+        df = df.assign(timestamp=pd.to_datetime(df['timestamp'])).set_index('timestamp')
     return df
 
 def resample_data(df, days):
@@ -0,0 +1,264 @@
+import io
+import os
+import uuid
+import asyncio
+import threading
+import weakref
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Sequence
+from sqlalchemy import create_engine, text
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.engine import Engine, make_url
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Pool defaults, overridable per process via environment variables
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # seconds, -1 disables
+POOLER_MODE = os.getenv('DB_POOLER_MODE', 'auto')  # auto | session | transaction
+PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'false').lower() in ('1', 'true', 'yes')
+PREPARE_THRESHOLD = int(os.getenv('DB_PREPARE_THRESHOLD', '2'))  # executions before a statement is prepared
+
+# Distinct SQL strings whose TextClause is kept by cached_text()
+STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '512'))
+
+# Supabase's transaction pooler (Supavisor) listens on 6543, the session pooler / direct connection on 5432
+TRANSACTION_POOLER_PORT = 6543
+
+_engines: Dict[tuple, Engine] = {}
+_engines_lock = threading.Lock()
+
+# Async engines, per event loop: asyncpg connections cannot move between loops
+_async_engines: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, object]]' = weakref.WeakKeyDictionary()
+
+
+def get_connection_string() -> str:
+    """Return DATABASE_URL or raise if it is not configured"""
+    connection_string = os.getenv('DATABASE_URL')
+    if not connection_string:
+        raise ValueError("DATABASE_URL environment variable not found")
+    return connection_string
+
+
+def resolve_pooler_mode(url: str, pooler_mode: str = 'auto') -> str:
+    """
+    Resolve 'auto' to 'transaction' or 'session' from the connection URL
+
+    Args:
+        url: Database URL
+        pooler_mode: 'auto', 'session' or 'transaction'
+
+    Returns:
+        'session' or 'transaction'
+    """
+    if pooler_mode not in ('auto', 'session', 'transaction'):
+        raise ValueError(f"Unknown pooler mode: {pooler_mode}")
+    if pooler_mode != 'auto':
+        return pooler_mode
+    return 'transaction' if make_url(url).port == TRANSACTION_POOLER_PORT else 'session'
+
+
+def get_engine(
+    url: Optional[str] = None,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_pre_ping: Optional[bool] = None,
+    pool_recycle: Optional[int] = None,
+    pooler_mode: Optional[str] = None,
+    prepared_statements: Optional[bool] = None,
+) -> Engine:
+    """
+    Return a shared, pooled SQLAlchemy engine
+
+    Engines are created once per (url, pool settings) and reused, so callers no longer pay
+    for a new engine and TCP/TLS handshake per query. Unset arguments fall back to the
+    DB_* environment variables.
+
+    Args:
+        url: Database URL (default: DATABASE_URL)
+        pool_size: Connections kept open in the pool
+        max_overflow: Extra connections allowed above pool_size under load
+        pool_pre_ping: Test connections on checkout and transparently replace dead ones
+        pool_recycle: Replace connections older than this many seconds (-1 disables)
+        pooler_mode: 'transaction' for Supabase's transaction pooler (no server-side
+                     prepared statements), 'session', or 'auto' to detect from the port
+        prepared_statements: Prepare statements on the server once they have run
+                             DB_PREPARE_THRESHOLD times on a connection, so hot queries skip
+                             parse and plan (PostgreSQL session mode only; uses psycopg 3)
+
+    Returns:
+        SQLAlchemy Engine
+    """
+    url = url or get_connection_string()
+    mode = resolve_pooler_mode(url, pooler_mode or POOLER_MODE)
+    if prepared_statements is None:
+        # The environment default only applies where prepared statements can work
+        prepared_statements = PREPARED_STATEMENTS and mode == 'session'
+    elif prepared_statements and mode == 'transaction':
+        raise ValueError("Prepared statements need a session pooler or direct connection, not transaction pooling")
+    settings = (
+        url,
+        POOL_SIZE if pool_size is None else pool_size,
+        MAX_OVERFLOW if max_overflow is None else max_overflow,
+        POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping,
+        POOL_RECYCLE if pool_recycle is None else pool_recycle,
+        mode,
+        prepared_statements,
+    )
+    with _engines_lock:
+        engine = _engines.get(settings)
+        if engine is None:
+            engine = _engines[settings] = _create_engine(*settings)
+    return engine
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int, pool_pre_ping: bool,
+                   pool_recycle: int, pooler_mode: str, prepared_statements: bool = False) -> Engine:
+    """Build an engine for the given pool settings"""
+    sa_url = make_url(url)
+    if prepared_statements and sa_url.get_backend_name() == 'postgresql':
+        # psycopg2 cannot prepare through SQLAlchemy; psycopg 3 does it transparently
+        sa_url = sa_url.set(drivername='postgresql+psycopg')
+        url = sa_url.render_as_string(hide_password=False)
+    kwargs = {'pool_pre_ping': pool_pre_ping, 'pool_recycle': pool_recycle}
+    connect_args = {}
+
+    if sa_url.get_backend_name() != 'sqlite':
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow)
+
+    if pooler_mode == 'transaction' and sa_url.get_driver_name() == 'psycopg':
+        # Transaction pooling hands each transaction to any server connection,
+        # so statements prepared on one backend are not visible on the next
+        connect_args['prepare_threshold'] = None
+    elif sa_url.get_driver_name() == 'psycopg':
+        # psycopg 3 would otherwise prepare after 5 executions on its own; keep it opt-in
+        connect_args['prepare_threshold'] = PREPARE_THRESHOLD if prepared_statements else None
+
+    return create_engine(url, connect_args=connect_args, **kwargs)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def cached_text(query: str) -> TextClause:
+    """
+    text(query), built once per distinct SQL string
+
+    TextClause objects are immutable once built, so hot queries reuse the same object
+    instead of re-parsing the SQL for bind parameters on every call.
+    """
+    return text(query)
+
+
+def copy_text_value(value) -> str:
+    """Encode a single value for COPY text format"""
+    if value is None:
+        return "\\N"
+    return (str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+
+def rows_to_copy_buffer(rows: Iterable[Sequence]) -> io.StringIO:
+    """Serialize rows into a COPY text format buffer, positioned at the start"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(copy_text_value(v) for v in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def copy_from_buffer(cursor, query: str, buffer: io.StringIO) -> None:
+    """Run COPY ... FROM STDIN with the buffer on a raw psycopg2 or psycopg 3 cursor"""
+    if hasattr(cursor, 'copy_expert'):  # psycopg2
+        cursor.copy_expert(query, buffer)
+    else:  # psycopg 3
+        with cursor.copy(query) as copy:
+            copy.write(buffer.getvalue())
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection held by the shared engines"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def to_async_url(url: str) -> str:
+    """postgresql://... or postgresql+psycopg2://... -> postgresql+asyncpg://..."""
+    sa_url = make_url(url)
+    if sa_url.get_backend_name() != 'postgresql':
+        raise ValueError(f"Async engine needs a PostgreSQL URL, got {sa_url.get_backend_name()}")
+    return sa_url.set(drivername='postgresql+asyncpg').render_as_string(hide_password=False)
+
+
+def get_async_engine(
+    url: Optional[str] = None,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_pre_ping: Optional[bool] = None,
+    pool_recycle: Optional[int] = None,
+    pooler_mode: Optional[str] = None,
+):
+    """
+    Return a shared, pooled async SQLAlchemy engine (asyncpg) for the running event loop
+
+    Takes the same settings as get_engine(); the driver in the URL is replaced by asyncpg.
+    Must be called from inside a coroutine. Each event loop gets its own engine and pool.
+
+    Returns:
+        SQLAlchemy AsyncEngine
+    """
+    loop = asyncio.get_running_loop()
+    url = to_async_url(url or get_connection_string())
+    settings = (
+        url,
+        POOL_SIZE if pool_size is None else pool_size,
+        MAX_OVERFLOW if max_overflow is None else max_overflow,
+        POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping,
+        POOL_RECYCLE if pool_recycle is None else pool_recycle,
+        resolve_pooler_mode(url, pooler_mode or POOLER_MODE),
+    )
+    with _engines_lock:
+        engines = _async_engines.setdefault(loop, {})
+        engine = engines.get(settings)
+        if engine is None:
+            engine = engines[settings] = _create_async_engine(*settings)
+    return engine
+
+
+def _create_async_engine(url: str, pool_size: int, max_overflow: int, pool_pre_ping: bool,
+                         pool_recycle: int, pooler_mode: str):
+    """Build an async engine for the given pool settings"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    connect_args = {}
+    if pooler_mode == 'transaction':
+        # No statement reuse across transactions: asyncpg's cache off, and unique
+        # names so two clients never collide on the same pooled backend
+        url = make_url(url).update_query_dict({'prepared_statement_cache_size': '0'})
+        connect_args['statement_cache_size'] = 0
+        connect_args['prepared_statement_name_func'] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+
+    return create_async_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=pool_pre_ping,
+        pool_recycle=pool_recycle,
+        connect_args=connect_args,
+    )
+
+
+async def dispose_async_engines() -> None:
+    """Close every pooled connection held by the running loop's async engines"""
+    with _engines_lock:
+        engines = _async_engines.pop(asyncio.get_running_loop(), {})
+    for engine in engines.values():
+        await engine.dispose()
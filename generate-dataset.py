@@ -0,0 +1,285 @@
+import os
+import math
+import time
+import uuid
+import random
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, make_url
+from rich import print
+from db import get_engine, copy_from_buffer, rows_to_copy_buffer
+
+'''
+Offline stand-in for the Supabase tables, for benchmarks that must run without the live project
+
+The collector snapshots every holding every 10 minutes:
+  - asset_master: one row per asset per snapshot (~2M rows at scale 1)
+  - asset_total_history_report: the snapshot's total in KRW (~88K rows at scale 1)
+  - my_asset: the first snapshot of each day (the table migration-sqlite3-to-supa.py loads)
+
+Usage:
+  python generate-dataset.py --url sqlite:///synthetic.db --scale 0.1
+  DATABASE_URL=sqlite:///synthetic.db python bench.py run
+'''
+
+DEFAULT_URL = os.getenv('SYNTHETIC_DATABASE_URL', 'sqlite:///synthetic.db')
+
+# Snapshot cadence and size of the production tables at scale 1
+SNAPSHOT_INTERVAL = timedelta(minutes=10)
+SNAPSHOTS = 88_000
+MAX_JITTER_SECONDS = 20       # the collector starts a few seconds late
+MISSED_SNAPSHOT_RATE = 0.005  # collector downtime leaves gaps
+TRADE_RATE = 1 / 2000         # chance per asset per snapshot that the held quantity changes
+
+START_USD_KRW = 1300.0
+FX_ANNUAL_VOL = 0.08
+
+# Rows per COPY / executemany call
+LOAD_BATCH_ROWS = 50_000
+
+# Snapshots per year (10 min) and 10-minute steps per year the market is open
+_STEPS_PER_YEAR = 365 * 24 * 6
+_MARKET_STEPS_PER_YEAR = {'crypto': _STEPS_PER_YEAR, 'us': 252 * 6.5 * 6, 'kr': 252 * 6.5 * 6, 'cash': _STEPS_PER_YEAR}
+
+# Trading hours in UTC, weekdays only (crypto and cash always "trade")
+_MARKET_HOURS = {'us': range(14, 21), 'kr': range(0, 7)}
+
+
+@dataclass
+class Asset:
+    name: str
+    div: str
+    market: str
+    price_usd: float
+    annual_vol: float
+    qty: float
+
+
+def asset_universe() -> List[Asset]:
+    """The 23 holdings every snapshot covers, with starting prices and volatilities"""
+    return [
+        Asset('BTC', 'crypto', 'crypto', 30_000.0, 0.60, 0.5),
+        Asset('ETH', 'crypto', 'crypto', 2_000.0, 0.75, 6.0),
+        Asset('SOL', 'crypto', 'crypto', 25.0, 1.00, 150.0),
+        Asset('XRP', 'crypto', 'crypto', 0.5, 0.90, 8_000.0),
+        Asset('DOGE', 'crypto', 'crypto', 0.07, 1.10, 30_000.0),
+        Asset('USDT', 'crypto', 'crypto', 1.0, 0.01, 3_000.0),
+        Asset('AAPL', 'stock_us', 'us', 170.0, 0.28, 40.0),
+        Asset('MSFT', 'stock_us', 'us', 330.0, 0.27, 25.0),
+        Asset('NVDA', 'stock_us', 'us', 45.0, 0.50, 200.0),
+        Asset('TSLA', 'stock_us', 'us', 250.0, 0.60, 30.0),
+        Asset('GOOGL', 'stock_us', 'us', 130.0, 0.30, 40.0),
+        Asset('AMZN', 'stock_us', 'us', 130.0, 0.32, 40.0),
+        Asset('SPY', 'stock_us', 'us', 440.0, 0.17, 20.0),
+        Asset('QQQ', 'stock_us', 'us', 370.0, 0.22, 15.0),
+        Asset('TLT', 'stock_us', 'us', 95.0, 0.15, 50.0),
+        Asset('GLD', 'stock_us', 'us', 180.0, 0.14, 20.0),
+        Asset('삼성전자', 'stock_kr', 'kr', 54.0, 0.30, 300.0),
+        Asset('SK하이닉스', 'stock_kr', 'kr', 100.0, 0.45, 50.0),
+        Asset('NAVER', 'stock_kr', 'kr', 150.0, 0.35, 30.0),
+        Asset('카카오', 'stock_kr', 'kr', 40.0, 0.40, 100.0),
+        Asset('KODEX200', 'stock_kr', 'kr', 26.0, 0.18, 400.0),
+        Asset('USD', 'cash', 'cash', 1.0, 0.0, 5_000.0),
+        Asset('KRW', 'cash', 'cash', 1 / START_USD_KRW, 0.0, 10_000_000.0),
+    ]
+
+
+def _market_open(market: str, at: datetime) -> bool:
+    hours = _MARKET_HOURS.get(market)
+    return hours is None or (at.weekday() < 5 and at.hour in hours)
+
+
+def generate_snapshots(seed: int = 42, scale: float = 1.0,
+                       end: Optional[datetime] = None) -> Iterator[Tuple[datetime, List[tuple]]]:
+    """
+    Yield (timestamp, asset rows) per snapshot, oldest first
+
+    Prices follow a geometric random walk per asset that only moves while its market
+    is open, USD/KRW drifts the same way, and held quantities change now and then
+    (noted as 매수/매도). The same seed and scale give the same values; timestamps end at
+    `end` (default: today 00:00 UTC).
+
+    Asset rows are (index, div, asset_name, qty, unit_usd, unit_krw, total_krw, asset_note).
+    """
+    rng = random.Random(seed)
+    assets = asset_universe()
+    count = max(1, round(SNAPSHOTS * scale))
+    end = end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - SNAPSHOT_INTERVAL * (count - 1)
+    fx = START_USD_KRW
+    fx_step_vol = FX_ANNUAL_VOL / math.sqrt(_STEPS_PER_YEAR)
+    step_vols = [asset.annual_vol / math.sqrt(_MARKET_STEPS_PER_YEAR[asset.market]) for asset in assets]
+
+    for step in range(count):
+        slot = start + SNAPSHOT_INTERVAL * step
+        fx *= math.exp(rng.gauss(0.0, fx_step_vol))
+        notes = [None] * len(assets)
+        for i, asset in enumerate(assets):
+            if step_vols[i] and _market_open(asset.market, slot):
+                asset.price_usd *= math.exp(rng.gauss(-step_vols[i] ** 2 / 2, step_vols[i]))
+            if asset.div != 'cash' and rng.random() < TRADE_RATE:
+                change = rng.uniform(0.7, 1.3)
+                asset.qty *= change
+                notes[i] = '매수' if change > 1 else '매도'
+        if rng.random() < MISSED_SNAPSHOT_RATE:
+            continue
+
+        timestamp = slot + timedelta(seconds=rng.randint(0, MAX_JITTER_SECONDS))
+        rows = []
+        for i, asset in enumerate(assets):
+            unit_usd = 1 / fx if asset.name == 'KRW' else asset.price_usd
+            unit_krw = 1.0 if asset.name == 'KRW' else asset.price_usd * fx
+            rows.append((i, asset.div, asset.name, round(asset.qty, 6), round(unit_usd, 6),
+                         round(unit_krw, 2), round(asset.qty * unit_krw), notes[i]))
+        yield timestamp, rows
+
+
+def _ddl(backend: str) -> Dict[str, str]:
+    if backend == 'postgresql':
+        real, ts, uid = 'double precision', 'timestamp with time zone', 'uuid not null default gen_random_uuid ()'
+    else:
+        real, ts, uid = 'real', 'text', 'text not null'
+    return {
+        'asset_master': f'''
+            CREATE TABLE asset_master (
+                "index" smallint, div text, asset_name text, qty {real}, unit_usd {real},
+                unit_krw {real}, total_krw {real}, asset_note text, "timestamp" {ts}
+            )''',
+        'asset_total_history_report': f'CREATE TABLE asset_total_history_report ("timestamp" {ts}, total {real})',
+        # Same columns as migration-sqlite3-to-supa.py's my_asset
+        'my_asset': f'''
+            CREATE TABLE my_asset (
+                "index" smallint, div text, asset text, qty real, unit_usd real, unit_krw real,
+                total_krw real, asset_note text, "timestamp" {ts}, seq {uid} primary key
+            )''',
+    }
+
+
+def create_tables(engine: Engine, replace: bool = False) -> None:
+    """Create the three tables, dropping existing ones only when `replace` is set"""
+    with engine.begin() as conn:
+        for table, ddl in _ddl(engine.dialect.name).items():
+            if engine.dialect.has_table(conn, table):
+                if not replace:
+                    raise ValueError(f"Table {table} already exists (use --replace to drop it)")
+                conn.execute(text(f"DROP TABLE {table}"))
+            conn.execute(text(ddl))
+
+
+class _TableWriter:
+    """Buffers rows for one table and writes them in LOAD_BATCH_ROWS batches on a raw DBAPI connection"""
+
+    def __init__(self, raw_conn, backend: str, table: str, columns: Sequence[str]):
+        self.raw_conn = raw_conn
+        self.backend = backend
+        self.rows: List[tuple] = []
+        self.written = 0
+        quoted = ', '.join(f'"{column}"' for column in columns)
+        if backend == 'postgresql':
+            self.sql = f"COPY {table} ({quoted}) FROM STDIN"
+        else:
+            self.sql = f"INSERT INTO {table} ({quoted}) VALUES ({', '.join('?' * len(columns))})"
+
+    def add(self, rows: Sequence[tuple]) -> None:
+        self.rows.extend(rows)
+        if len(self.rows) >= LOAD_BATCH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        cursor = self.raw_conn.cursor()
+        if self.backend != 'postgresql':
+            cursor.executemany(self.sql, self.rows)
+        else:
+            copy_from_buffer(cursor, self.sql, rows_to_copy_buffer(self.rows))
+        cursor.close()
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def generate_dataset(url: str = DEFAULT_URL, seed: int = 42, scale: float = 1.0,
+                     end: Optional[datetime] = None, replace: bool = False) -> Dict[str, int]:
+    """
+    Create and fill asset_master, asset_total_history_report and my_asset
+
+    Args:
+        url: Target database (local PostgreSQL or SQLite)
+        seed: Random seed; the same seed and scale give the same data
+        scale: Fraction of the production size (1.0 = ~88K snapshots, ~2M asset rows)
+        end: Timestamp of the last snapshot (default: today 00:00 UTC)
+        replace: Drop the tables if they already exist
+
+    Returns:
+        Rows written per table
+    """
+    engine = get_engine(url)
+    backend = engine.dialect.name
+    if backend not in ('postgresql', 'sqlite'):
+        raise ValueError(f"Unsupported database: {backend} (use PostgreSQL or SQLite)")
+    create_tables(engine, replace=replace)
+
+    uuid_rng = random.Random(seed)
+    as_time = (lambda ts: ts) if backend == 'postgresql' else (lambda ts: ts.isoformat(sep=' '))
+    raw_conn = engine.raw_connection()
+    try:
+        master = _TableWriter(raw_conn, backend, 'asset_master',
+                              ['index', 'div', 'asset_name', 'qty', 'unit_usd', 'unit_krw', 'total_krw',
+                               'asset_note', 'timestamp'])
+        report = _TableWriter(raw_conn, backend, 'asset_total_history_report', ['timestamp', 'total'])
+        my_asset = _TableWriter(raw_conn, backend, 'my_asset',
+                                ['index', 'div', 'asset', 'qty', 'unit_usd', 'unit_krw', 'total_krw',
+                                 'asset_note', 'timestamp', 'seq'])
+        last_day = None
+        for timestamp, rows in generate_snapshots(seed, scale, end):
+            ts = as_time(timestamp)
+            master.add([row + (ts,) for row in rows])
+            report.add([(ts, sum(row[6] for row in rows))])
+            # 하루 첫 스냅샷만 my_asset 에 기록
+            if timestamp.date() != last_day:
+                last_day = timestamp.date()
+                my_asset.add([row + (ts, str(uuid.UUID(int=uuid_rng.getrandbits(128), version=4))) for row in rows])
+        for writer in (master, report, my_asset):
+            writer.flush()
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return {'asset_master': master.written, 'asset_total_history_report': report.written, 'my_asset': my_asset.written}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic copy of the asset tables in a local database")
+    parser.add_argument("--url", default=DEFAULT_URL,
+                        help="target database, local PostgreSQL or SQLite (default: SYNTHETIC_DATABASE_URL or sqlite:///synthetic.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="fraction of the production size (1.0 = ~88K snapshots, ~2M asset_master rows)")
+    parser.add_argument("--end", type=datetime.fromisoformat,
+                        help="timestamp of the last snapshot, e.g. 2025-01-01T00:00:00+00:00 (default: today 00:00 UTC)")
+    parser.add_argument("--replace", action="store_true", help="drop existing tables first")
+    parser.add_argument("--force", action="store_true", help="allow a Supabase host as the target")
+    args = parser.parse_args()
+
+    host = make_url(args.url).host or ''
+    if 'supabase' in host and not args.force:
+        raise SystemExit(f"Refusing to write synthetic data to {host} (use --force)")
+    end = args.end.replace(tzinfo=args.end.tzinfo or timezone.utc) if args.end else None
+
+    start_time = time.perf_counter()
+    try:
+        counts = generate_dataset(args.url, seed=args.seed, scale=args.scale, end=end, replace=args.replace)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for table, count in counts.items():
+        print(f"{table}: {count:,} rows")
+    print(f"Generated in {time.perf_counter() - start_time:.1f} seconds")
+    print(f"Point the benchmarks and dashboard at it with DATABASE_URL={make_url(args.url).render_as_string(hide_password=True)}")
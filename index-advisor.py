@@ -0,0 +1,326 @@
+import re
+import json
+import hashlib
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from rich import print
+from db import get_engine
+from plan_capture import PlanStore, PLAN_STORE_PATH
+
+# Shared, pooled SQLAlchemy engine (pool settings come from DB_* environment variables)
+engine = get_engine()
+
+# 프로젝트의 주요 쿼리 (main.py 예제, 대시보드, 벤치마크)
+BUILTIN_WORKLOAD: List[Tuple[str, Dict]] = [
+    ("SELECT * FROM asset_master ORDER BY timestamp DESC LIMIT 20 OFFSET 40", {}),
+    ("SELECT * FROM asset_total_history_report ORDER BY timestamp DESC LIMIT 1000", {}),
+    ("SELECT * FROM asset_master WHERE asset_name = :asset_name ORDER BY timestamp DESC", {"asset_name": "BTC"}),
+    (
+        "SELECT timestamp, total FROM asset_total_history_report WHERE timestamp >= :start_date ORDER BY timestamp",
+        {"start_date": (datetime.now(timezone.utc) - timedelta(days=30)).strftime('%Y-%m-%d')},
+    ),
+]
+
+# BRIN is proposed for range predicates on columns whose physical order follows their values
+BRIN_MIN_CORRELATION = 0.9
+
+# A candidate is recommended if it cuts some query's estimated cost by at least this fraction
+MIN_GAIN = 0.2
+
+# Left-hand column of a comparison in a plan's Filter, e.g. (asset_name = 'BTC'::text), ("timestamp" >= ...)
+_PREDICATE_PATTERN = re.compile(r'\(*"?([A-Za-z_][A-Za-z0-9_]*)"?\)?(?:::[\w ]+)?\s*(=|>=|<=|>|<)\s')
+
+
+@dataclass
+class Candidate:
+    """Proposed index"""
+    table: str
+    columns: Tuple[str, ...]
+    method: str = 'btree'
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        """Index name; sort direction is part of it, so (timestamp DESC) and (timestamp) do not collide"""
+        prefix = 'idx' if self.method == 'btree' else self.method
+        name = f"{prefix}_{self.table}_{'_'.join(_column_label(c) for c in self.columns)}"
+        if len(name) > 63:
+            # PostgreSQL truncates identifiers at 63 bytes; keep truncated names distinct
+            name = f"{name[:54]}_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+        return name
+
+    def ddl(self, concurrently: bool = False) -> str:
+        columns = ', '.join(_quote_column(c) for c in self.columns)
+        return (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {self.name} "
+                f"ON {self.table} USING {self.method} ({columns})")
+
+
+def _column_label(column: str) -> str:
+    """'timestamp DESC' -> 'timestamp_desc', 'timestamp ASC' -> 'timestamp' (ASC is the default)"""
+    return '_'.join(part.lower() for part in column.split() if part.upper() != 'ASC')
+
+
+def _quote_column(column: str) -> str:
+    name, *direction = column.split()
+    return ' '.join([f'"{name}"', *direction])
+
+
+def table_columns(conn: Connection) -> Dict[str, Set[str]]:
+    """Columns of every table in the public schema"""
+    rows = conn.execute(text(
+        "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'public'"
+    ))
+    columns: Dict[str, Set[str]] = {}
+    for table, column in rows:
+        columns.setdefault(table, set()).add(column)
+    return columns
+
+
+def existing_indexes(conn: Connection) -> Dict[str, List[Tuple[str, Tuple[str, ...]]]]:
+    """Existing indexes per table as (method, columns)"""
+    rows = conn.execute(text("""
+        SELECT t.relname, am.amname, array_agg(a.attname ORDER BY k.ord)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        JOIN pg_am am ON am.oid = i.relam
+        CROSS JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE n.nspname = 'public'
+        GROUP BY t.relname, i.relname, am.amname
+    """))
+    indexes: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {}
+    for table, method, columns in rows:
+        indexes.setdefault(table, []).append((method, tuple(columns)))
+    return indexes
+
+
+def column_correlation(conn: Connection, table: str, column: str) -> float:
+    """pg_stats correlation between physical row order and column order (0 if not analyzed)"""
+    value = conn.execute(text(
+        "SELECT correlation FROM pg_stats WHERE schemaname = 'public' AND tablename = :table AND attname = :column"
+    ), {"table": table, "column": column}).scalar()
+    return abs(value or 0.0)
+
+
+def explain(conn: Connection, query: str, params: Dict) -> Dict[str, Any]:
+    """Top plan node of EXPLAIN (FORMAT JSON), without running the query"""
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def _scans(node: Dict[str, Any], sort_keys: Sequence[str] = ()) -> List[Tuple[Dict[str, Any], Sequence[str]]]:
+    """(scan node, sort keys of the nearest Sort above it) for every relation scan"""
+    if node['Node Type'] in ('Sort', 'Incremental Sort'):
+        sort_keys = node.get('Sort Key', [])
+    found = [(node, sort_keys)] if node.get('Relation Name') else []
+    for child in node.get('Plans', []):
+        found.extend(_scans(child, sort_keys))
+    return found
+
+
+def _sort_column(sort_key: str, columns: Set[str]) -> Optional[str]:
+    """'asset_master."timestamp" DESC' -> 'timestamp DESC' if it is a plain column of the table"""
+    expression, _, direction = sort_key.partition(' ')
+    name = expression.split('.')[-1].strip('"')
+    if name not in columns:
+        return None
+    return f"{name} DESC" if 'DESC' in direction.upper() else name
+
+
+def propose_candidates(conn: Connection, workload: Sequence[Tuple[str, Dict]]) -> List[Candidate]:
+    """
+    Candidate indexes from the plans of the workload
+
+    For every sequential scan, equality filter columns come first, then the sort columns
+    (a B-tree can then return rows already ordered) or a range column. Single-column
+    B-trees on the sort or range column and BRIN on well-correlated range columns are
+    proposed too.
+    """
+    columns = table_columns(conn)
+    candidates: Dict[Tuple[str, Tuple[str, ...], str], Candidate] = {}
+
+    def add(table: str, cols: Sequence[str], method: str, reason: str):
+        cols = tuple(dict.fromkeys(cols))
+        if not cols:
+            return
+        candidate = candidates.setdefault((table, cols, method), Candidate(table, cols, method))
+        if reason not in candidate.reasons:
+            candidate.reasons.append(reason)
+
+    for query, params in workload:
+        plan = explain(conn, query, params)
+        for node, sort_keys in _scans(plan):
+            table = node['Relation Name']
+            if node['Node Type'] != 'Seq Scan' or table not in columns:
+                continue
+            equality, ranges = [], []
+            for column, operator in _PREDICATE_PATTERN.findall(node.get('Filter', '')):
+                if column in columns[table]:
+                    (equality if operator == '=' else ranges).append(column)
+            order = [c for c in (_sort_column(k, columns[table]) for k in sort_keys) if c]
+            reason = ' '.join(query.split())[:100]
+
+            if equality or order or ranges:
+                add(table, equality + (order or ranges[:1]), 'btree', reason)
+            if order:
+                add(table, order, 'btree', reason)
+            for column in ranges[:1]:
+                add(table, [column], 'btree', reason)
+                if column_correlation(conn, table, column) >= BRIN_MIN_CORRELATION:
+                    add(table, [column], 'brin', reason)
+    return list(candidates.values())
+
+
+def is_covered(candidate: Candidate, indexes: Dict[str, List[Tuple[str, Tuple[str, ...]]]]) -> bool:
+    """True if an existing index of the same kind already starts with the candidate's columns"""
+    wanted = tuple(c.split()[0] for c in candidate.columns)
+    return any(method == candidate.method and columns[:len(wanted)] == wanted
+               for method, columns in indexes.get(candidate.table, []))
+
+
+def hypopg_available(conn: Connection) -> bool:
+    """Try to enable the hypopg extension (hypothetical indexes)"""
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS hypopg"))
+        return True
+    except Exception:
+        return False
+
+
+def workload_costs(conn: Connection, workload: Sequence[Tuple[str, Dict]]) -> List[float]:
+    return [explain(conn, query, params)['Total Cost'] for query, params in workload]
+
+
+def evaluate(conn: Connection, candidate: Candidate, workload: Sequence[Tuple[str, Dict]], method: str) -> List[float]:
+    """
+    Planner cost of every workload query with the candidate index in place
+
+    'hypopg' registers a hypothetical index (nothing is built). 'trial' builds the index
+    inside a transaction that is rolled back; the build locks the table against writes,
+    so use it on a local copy.
+    """
+    if method == 'hypopg':
+        conn.execute(text("SELECT * FROM hypopg_create_index(:ddl)"), {"ddl": candidate.ddl()})
+        try:
+            return workload_costs(conn, workload)
+        finally:
+            conn.execute(text("SELECT hypopg_reset()"))
+
+    trial = conn.begin_nested()
+    try:
+        conn.execute(text(candidate.ddl()))
+        return workload_costs(conn, workload)
+    finally:
+        trial.rollback()
+
+
+def advise(workload: Sequence[Tuple[str, Dict]], method: str = 'auto', min_gain: float = MIN_GAIN) -> List[Dict[str, Any]]:
+    """
+    Propose indexes for a workload and estimate their benefit
+
+    Candidates are ranked by total estimated cost saved and accepted greedily: one is
+    recommended only if it cuts some query's cost by `min_gain` beyond what the
+    candidates accepted before it already achieve.
+
+    Args:
+        workload: (SQL, params) pairs
+        method: 'hypopg', 'trial' or 'auto' (hypopg if it can be enabled)
+        min_gain: Minimum fractional cost reduction for one query
+
+    Returns:
+        Recommendations: {'candidate', 'before', 'after', 'saved'} with per-query costs
+    """
+    with engine.connect() as conn:
+        if method == 'auto':
+            method = 'hypopg' if hypopg_available(conn) else 'trial'
+        elif method == 'hypopg' and not hypopg_available(conn):
+            raise ValueError("hypopg extension is not available")
+        print(f"Estimating with {'hypothetical' if method == 'hypopg' else 'trial'} indexes")
+
+        indexes = existing_indexes(conn)
+        candidates = [c for c in propose_candidates(conn, workload) if not is_covered(c, indexes)]
+        before = workload_costs(conn, workload)
+        evaluated = []
+        for candidate in candidates:
+            after = evaluate(conn, candidate, workload, method)
+            evaluated.append({
+                'candidate': candidate,
+                'before': before,
+                'after': after,
+                'saved': sum(b - a for b, a in zip(before, after)),
+            })
+        conn.rollback()
+
+    recommendations = []
+    best = list(before)
+    for result in sorted(evaluated, key=lambda r: -r['saved']):
+        if any(a < b * (1 - min_gain) for a, b in zip(result['after'], best)):
+            recommendations.append(result)
+            best = [min(a, b) for a, b in zip(result['after'], best)]
+    return recommendations
+
+
+def create_indexes(candidates: Sequence[Candidate]) -> None:
+    """CREATE INDEX CONCURRENTLY for each candidate (no long write lock; cannot run in a transaction)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for candidate in candidates:
+            print(f"Creating {candidate.name} ...", flush=True)
+            conn.execute(text(candidate.ddl(concurrently=True)))
+            conn.execute(text(f"ANALYZE {candidate.table}"))
+
+
+def load_workload(builtin: bool = True, plan_store: Optional[str] = None,
+                  queries_file: Optional[str] = None) -> List[Tuple[str, Dict]]:
+    """Built-in queries, statements captured by plan_capture.py and/or a file of ';'-separated SQL"""
+    workload = list(BUILTIN_WORKLOAD) if builtin else []
+    if plan_store:
+        for record in PlanStore(plan_store).latest_all():
+            if record.get('statement'):
+                workload.append((record['statement'], record.get('params') or {}))
+    if queries_file:
+        with open(queries_file) as f:
+            workload.extend((q.strip(), {}) for q in f.read().split(';') if q.strip())
+    return workload
+
+
+def print_recommendations(workload: Sequence[Tuple[str, Dict]], recommendations: Sequence[Dict[str, Any]]) -> None:
+    if not recommendations:
+        print("\nNo index would reduce the workload's estimated cost enough.")
+        return
+    print(f"\n=== {len(recommendations)} recommended index(es) for {len(workload)} queries ===")
+    for result in recommendations:
+        candidate = result['candidate']
+        print(f"\n{candidate.ddl()};")
+        print(f"  estimated cost saved: {result['saved']:,.0f}")
+        for (query, _), before, after in zip(workload, result['before'], result['after']):
+            if after < before:
+                print(f"  {before:>12,.0f} -> {after:>10,.0f} ({(1 - after / before) * 100:5.1f}%)  {' '.join(query.split())[:90]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose indexes for the project's query workload")
+    parser.add_argument("--no-builtin", action="store_true", help="skip the built-in example/dashboard queries")
+    parser.add_argument("--plan-store", nargs='?', const=PLAN_STORE_PATH, default=None,
+                        help="add statements captured by plan capture (default store: %(const)s)")
+    parser.add_argument("--queries-file", help="file of ';'-separated SQL statements to add to the workload")
+    parser.add_argument("--method", choices=["auto", "hypopg", "trial"], default="auto",
+                        help="hypothetical indexes (hypopg) or trial builds rolled back afterwards (local database only)")
+    parser.add_argument("--min-gain", type=float, default=MIN_GAIN,
+                        help="minimum fractional cost reduction of one query for a recommendation")
+    parser.add_argument("--create", action="store_true", help="create the recommended indexes with CREATE INDEX CONCURRENTLY")
+    args = parser.parse_args()
+
+    workload = load_workload(not args.no_builtin, args.plan_store, args.queries_file)
+    recommendations = advise(workload, method=args.method, min_gain=args.min_gain)
+    print_recommendations(workload, recommendations)
+    if args.create and recommendations:
+        create_indexes([result['candidate'] for result in recommendations])
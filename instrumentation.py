@@ -0,0 +1,303 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (Prometheus style, +Inf implied)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fingerprints beyond this many are counted under OTHER_FINGERPRINT (bounded label cardinality)
+MAX_FINGERPRINTS = 500
+OTHER_FINGERPRINT = 'other'
+
+_COMMENT_PATTERN = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_PARAM_PATTERN = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?')
+_NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST_PATTERN = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Normalized statement text: comments dropped, literals and parameters replaced by ?
+
+    `... asset_name = :asset_name LIMIT 10` and `... asset_name = %(asset_name)s LIMIT 20`
+    share one fingerprint, so the SQL the helpers receive and what the driver executes
+    are counted together.
+    """
+    statement = _COMMENT_PATTERN.sub(' ', statement)
+    statement = _STRING_PATTERN.sub('?', statement)
+    statement = _PARAM_PATTERN.sub('?', statement)
+    statement = _NUMBER_PATTERN.sub('?', statement)
+    statement = _LIST_PATTERN.sub('(?...)', statement)
+    return re.sub(r'\s+', ' ', statement).strip().rstrip(';').strip()
+
+
+def query_id(fingerprint_text: str) -> str:
+    """Short stable id for a fingerprint"""
+    return hashlib.md5(fingerprint_text.encode()).hexdigest()[:12]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if it is the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class QueryMetrics:
+    """
+    In-memory query metrics fed by SQLAlchemy engine events
+
+    Per statement fingerprint it keeps execute and fetch latency histograms and row
+    counts; new physical connections get a connect latency histogram. Statements slower
+    than `slow_threshold` seconds are kept in a bounded slow-query log and logged as warnings.
+
+    Usage:
+        metrics = QueryMetrics(slow_threshold=0.5)
+        metrics.attach(engine)
+        ...
+        print(metrics.to_prometheus())
+    """
+
+    def __init__(self, slow_threshold: float = 0.5, slow_log_size: int = 100,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_fingerprints: int = MAX_FINGERPRINTS):
+        self.slow_threshold = slow_threshold
+        self.buckets = buckets
+        self.max_fingerprints = max_fingerprints
+        self.started_at = datetime.now(timezone.utc)
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._rows: Dict[str, int] = {}
+        self._slow_counts: Dict[str, int] = {}
+        self._connect = Histogram(buckets)
+        self._slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._engines: List[Engine] = []
+        self._lock = threading.Lock()
+
+    # --- recording -------------------------------------------------------------
+
+    def _fingerprint(self, statement: str) -> str:
+        text = fingerprint(statement)
+        if text not in self._rows and len(self._rows) >= self.max_fingerprints:
+            return OTHER_FINGERPRINT
+        return text
+
+    def observe(self, phase: str, statement: str, seconds: float, rows: Optional[int] = None,
+                count_rows: Optional[bool] = None) -> None:
+        """
+        Record one execute/fetch of a statement
+
+        Args:
+            phase: 'execute' or 'fetch'
+            statement: SQL as given or as sent to the driver
+            seconds: Elapsed time
+            rows: Rows returned or affected (None or -1 if unknown)
+            count_rows: Add `rows` to the row counter; defaults to True for 'execute', where
+                        the driver's rowcount is known unless a server-side cursor is used
+        """
+        if count_rows is None:
+            count_rows = phase == 'execute'
+        with self._lock:
+            text = self._fingerprint(statement)
+            histogram = self._histograms.get((text, phase))
+            if histogram is None:
+                histogram = self._histograms[(text, phase)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self._rows[text] = self._rows.get(text, 0) + (rows if count_rows and rows and rows > 0 else 0)
+            slow = seconds >= self.slow_threshold
+            if slow:
+                self._slow_counts[text] = self._slow_counts.get(text, 0) + 1
+                self._slow_log.append({
+                    'time': datetime.now(timezone.utc).isoformat(),
+                    'phase': phase,
+                    'seconds': seconds,
+                    'rows': rows,
+                    'query_id': query_id(text),
+                    'statement': statement.strip()[:2000],
+                })
+        if slow:
+            logger.warning("Slow query (%s, %.3fs): %s", phase, seconds, text[:200])
+
+    def observe_connect(self, seconds: float) -> None:
+        """Record the time taken to open a new physical connection"""
+        with self._lock:
+            self._connect.observe(seconds)
+
+    # --- engine events ---------------------------------------------------------
+
+    def attach(self, engine: Engine) -> 'QueryMetrics':
+        """Start recording connect and execute times of an engine"""
+        event.listen(engine, 'do_connect', self._before_connect)
+        event.listen(engine, 'connect', self._after_connect)
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        event.listen(engine, 'handle_error', self._on_error)
+        self._engines.append(engine)
+        return self
+
+    def detach(self, engine: Optional[Engine] = None) -> None:
+        """Stop recording an engine (default: every attached engine)"""
+        for attached in ([engine] if engine is not None else list(self._engines)):
+            event.remove(attached, 'do_connect', self._before_connect)
+            event.remove(attached, 'connect', self._after_connect)
+            event.remove(attached, 'before_cursor_execute', self._before_execute)
+            event.remove(attached, 'after_cursor_execute', self._after_execute)
+            event.remove(attached, 'handle_error', self._on_error)
+            self._engines.remove(attached)
+
+    def _before_connect(self, dialect, conn_rec, cargs, cparams):
+        conn_rec.info['connect_started'] = time.perf_counter()
+
+    def _after_connect(self, dbapi_connection, conn_rec):
+        started = conn_rec.info.pop('connect_started', None)
+        if started is not None:
+            self.observe_connect(time.perf_counter() - started)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('execute_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # No start time if the engine was attached while this statement was running
+        started = conn.info.get('execute_started')
+        if started:
+            self.observe('execute', statement, time.perf_counter() - started.pop(), cursor.rowcount)
+
+    def _on_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        if exception_context.connection is not None:
+            exception_context.connection.info.pop('execute_started', None)
+
+    # --- export ----------------------------------------------------------------
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Slow-query log, oldest first"""
+        with self._lock:
+            return list(self._slow_log)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every metric as plain data"""
+        with self._lock:
+            queries: Dict[str, Dict[str, Any]] = {}
+            for (text, phase), histogram in self._histograms.items():
+                entry = queries.setdefault(text, {
+                    'query_id': query_id(text),
+                    'statement': text,
+                    'rows': self._rows.get(text, 0),
+                    'slow': self._slow_counts.get(text, 0),
+                })
+                entry[phase] = histogram.to_dict()
+            return {
+                'started_at': self.started_at.isoformat(),
+                'slow_threshold': self.slow_threshold,
+                'connect': self._connect.to_dict(),
+                'queries': sorted(queries.values(), key=lambda q: -sum(
+                    q[phase]['sum'] for phase in ('execute', 'fetch') if phase in q)),
+                'slow_queries': list(self._slow_log),
+            }
+
+    def to_json(self, path: Optional[str] = None, indent: int = 2) -> str:
+        """JSON dump of snapshot(), optionally written to `path`"""
+        dump = json.dumps(self.snapshot(), indent=indent, default=str)
+        if path:
+            with open(path, 'w') as f:
+                f.write(dump)
+        return dump
+
+    def to_prometheus(self, prefix: str = 'db') -> str:
+        """Metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_query_duration_seconds Query time by statement fingerprint and phase",
+            f"# TYPE {prefix}_query_duration_seconds histogram",
+        ]
+        for query in snapshot['queries']:
+            labels = f'query_id="{query["query_id"]}",statement="{_escape_label(query["statement"][:200])}"'
+            for phase in ('execute', 'fetch'):
+                if phase in query:
+                    lines.extend(_histogram_lines(f"{prefix}_query_duration_seconds",
+                                                  f'{labels},phase="{phase}"', query[phase]))
+        lines += [
+            f"# HELP {prefix}_query_rows_total Rows fetched by statement fingerprint",
+            f"# TYPE {prefix}_query_rows_total counter",
+        ]
+        lines += [f'{prefix}_query_rows_total{{query_id="{q["query_id"]}"}} {q["rows"]}' for q in snapshot['queries']]
+        lines += [
+            f"# HELP {prefix}_slow_queries_total Statements slower than the slow-query threshold",
+            f"# TYPE {prefix}_slow_queries_total counter",
+        ]
+        lines += [f'{prefix}_slow_queries_total{{query_id="{q["query_id"]}"}} {q["slow"]}' for q in snapshot['queries']]
+        lines += [
+            f"# HELP {prefix}_connect_duration_seconds Time to open a new database connection",
+            f"# TYPE {prefix}_connect_duration_seconds histogram",
+        ]
+        lines.extend(_histogram_lines(f"{prefix}_connect_duration_seconds", '', snapshot['connect']))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """Clear every histogram, counter and the slow-query log"""
+        with self._lock:
+            self._histograms.clear()
+            self._rows.clear()
+            self._slow_counts.clear()
+            self._slow_log.clear()
+            self._connect = Histogram(self.buckets)
+            self.started_at = datetime.now(timezone.utc)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _histogram_lines(name: str, labels: str, histogram: Dict[str, Any]) -> List[str]:
+    sep = ',' if labels else ''
+    lines = []
+    cumulative = 0
+    for bound, count in histogram['buckets'].items():
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]}' if labels else f'{name}_sum {histogram["sum"]}')
+    lines.append(f'{name}_count{{{labels}}} {histogram["count"]}' if labels else f'{name}_count {histogram["count"]}')
+    return lines
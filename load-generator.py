@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import random
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from rich import print
+
+'''
+Concurrent load against the project's queries, stepping up concurrency to find where the pool/database saturates
+
+Every step runs N workers (threads sharing one engine pool, or processes with a pool each) for
+a fixed duration. Workers pick operations from a weighted mix:
+  - pagination: a page of asset_master ordered by timestamp (paginate_query)
+  - point:      latest asset_master row of one asset (fetch_one)
+  - report:     a date range of asset_total_history_report (fetch_all, as the dashboard does)
+
+With a target rate, operations are scheduled at fixed intervals and latency is measured from the
+scheduled start, so time spent waiting behind a slow call (or for a pooled connection) is counted
+instead of silently lowering the offered load.
+
+Usage:
+  python load-generator.py --concurrency 1 2 4 8 16 32 --duration 10 --mix pagination=5,point=3,report=2
+  python load-generator.py --rate 200 --pool-size 10 --max-overflow 0 --output curve.json --plot curve.html
+'''
+
+OPERATIONS = ('pagination', 'point', 'report')
+DEFAULT_MIX = 'pagination=5,point=3,report=2'
+
+PAGINATION_QUERY = "SELECT * FROM asset_master ORDER BY timestamp DESC"
+POINT_QUERY = "SELECT * FROM asset_master WHERE asset_name = :asset_name ORDER BY timestamp DESC LIMIT 1"
+REPORT_QUERY = """
+    SELECT timestamp, total
+    FROM asset_total_history_report
+    WHERE timestamp >= :start_date AND timestamp < :end_date
+    ORDER BY timestamp
+"""
+
+# A step saturated when throughput grew less than this fraction over the previous step
+SATURATION_GAIN = 0.05
+
+# Seconds between submitting the workers and the start of measurement (imports, first connection)
+START_DELAY = {'thread': 0.5, 'process': 3.0}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'pagination=5,point=3' -> {'pagination': 5.0, 'point': 3.0}"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name} (choose from {', '.join(OPERATIONS)})")
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("Operation mix has no positive weight")
+    return weights
+
+
+def workload_parameters() -> Dict[str, Any]:
+    """Asset names and the report's time range, looked up once and shared with every worker"""
+    from main import fetch_all, fetch_one
+
+    names = [row['asset_name'] for row in fetch_all("SELECT DISTINCT asset_name FROM asset_master", use_cache=False)]
+    bounds = fetch_one("SELECT MIN(timestamp) AS first, MAX(timestamp) AS last FROM asset_total_history_report",
+                       use_cache=False)
+    if not names or not bounds or bounds['first'] is None:
+        raise ValueError("asset_master and asset_total_history_report need data (see generate-dataset.py)")
+    first, last = (value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+                   for value in (bounds['first'], bounds['last']))
+    return {'asset_names': names, 'first': first.isoformat(sep=' '), 'last': last.isoformat(sep=' ')}
+
+
+def _run_operation(name: str, rng: random.Random, config: Dict[str, Any]) -> int:
+    """Run one operation and return the number of rows it returned"""
+    from main import fetch_all, fetch_one, paginate_query
+
+    if name == 'pagination':
+        page = paginate_query(PAGINATION_QUERY, page=rng.randint(1, config['max_page']), per_page=config['per_page'],
+                              count_strategy=config['count_strategy'], use_cache=False)
+        return len(page.items)
+    if name == 'point':
+        return int(fetch_one(POINT_QUERY, {'asset_name': rng.choice(config['asset_names'])}, use_cache=False) is not None)
+
+    first = datetime.fromisoformat(config['first'])
+    last = datetime.fromisoformat(config['last'])
+    window = timedelta(days=config['report_days'])
+    start = first + (last - first - window) * rng.random() if last - first > window else first
+    # ' ' separator: SQLite compares the timestamps as text
+    params = {'start_date': start.isoformat(sep=' '), 'end_date': (start + window).isoformat(sep=' ')}
+    return len(fetch_all(REPORT_QUERY, params, use_cache=False))
+
+
+def run_worker(worker_id: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One load worker: warm up, wait for the common start, then run operations until the step ends
+
+    Returns:
+        {'samples': [(operation, latency_ns, ok)], 'late_ns': time the worker started after the common start,
+         'first_error': message of the first failed operation, 'finished_at': time.time() after the last one}
+    """
+    rng = random.Random(config['seed'] * 10_007 + worker_id)
+    names = list(config['mix'])
+    weights = [config['mix'][name] for name in names]
+
+    # 연결 풀을 미리 채워 첫 측정에 연결 시간이 섞이지 않게 한다
+    from main import fetch_one
+    fetch_one("SELECT 1 AS ok", use_cache=False)
+
+    start_at, stop_at = config['start_at'], config['start_at'] + config['duration']
+    now = time.time()
+    late_ns = max(0, int((now - start_at) * 1e9))
+    if now < start_at:
+        time.sleep(start_at - now)
+
+    # Open loop: worker i of n runs at rate/n, phase-shifted so the workers do not fire together
+    interval = config['concurrency'] / config['rate'] if config['rate'] else 0.0
+    next_at = time.perf_counter() + interval * worker_id / config['concurrency']
+    samples: List[Tuple[str, int, bool]] = []
+    first_error = None
+    while time.time() < stop_at:
+        if interval:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            scheduled = next_at
+            next_at += interval
+        else:
+            scheduled = time.perf_counter()
+        name = rng.choices(names, weights)[0]
+        try:
+            _run_operation(name, rng, config)
+            ok = True
+        except Exception as e:
+            ok = False
+            first_error = first_error or f"{name}: {type(e).__name__}: {e}"[:500]
+        samples.append((name, int((time.perf_counter() - scheduled) * 1e9), ok))
+    return {'samples': samples, 'late_ns': late_ns, 'first_error': first_error, 'finished_at': time.time()}
+
+
+def run_step(concurrency: int, config: Dict[str, Any], mode: str = 'thread') -> Dict[str, Any]:
+    """
+    Run `concurrency` workers for config['duration'] seconds and summarize throughput and latency
+
+    Returns:
+        {'concurrency', 'target_rate', 'throughput' (ops/s), 'elapsed', 'operations', 'errors', 'latency': bench.summarize(),
+         'by_operation': {operation: {'count', 'errors', 'latency'}}, 'late_workers', 'first_error'}
+    """
+    from bench import summarize
+
+    step_config = dict(config, concurrency=concurrency, start_at=time.time() + START_DELAY[mode])
+    if mode == 'process':
+        # spawn, not fork: a forked child would share the parent's pooled connections
+        executor = ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+    with executor:
+        futures = [executor.submit(run_worker, worker_id, step_config) for worker_id in range(concurrency)]
+        results = [future.result() for future in futures]
+
+    samples = [sample for result in results for sample in result['samples']]
+    # Operations started before the end of the step may finish after it
+    elapsed = max(config['duration'], max(result['finished_at'] for result in results) - step_config['start_at'])
+    completed = [latency for _, latency, ok in samples if ok]
+    by_operation = {}
+    for name in config['mix']:
+        latencies = [latency for op, latency, ok in samples if op == name and ok]
+        by_operation[name] = {
+            'count': len(latencies),
+            'errors': sum(1 for op, _, ok in samples if op == name and not ok),
+            'latency': summarize(latencies) if latencies else None,
+        }
+    return {
+        'concurrency': concurrency,
+        'target_rate': config['rate'] or None,
+        'throughput': len(completed) / elapsed,
+        'elapsed': elapsed,
+        'operations': len(samples),
+        'errors': len(samples) - len(completed),
+        'latency': summarize(completed) if completed else None,
+        'by_operation': by_operation,
+        'late_workers': sum(1 for result in results if result['late_ns'] > 0),
+        'first_error': next((result['first_error'] for result in results if result['first_error']), None),
+    }
+
+
+def saturation_point(steps: Sequence[Dict[str, Any]]) -> Optional[int]:
+    """Concurrency of the first step whose throughput grew less than SATURATION_GAIN over the previous one"""
+    for previous, step in zip(steps, steps[1:]):
+        if step['throughput'] < previous['throughput'] * (1 + SATURATION_GAIN):
+            return previous['concurrency']
+    return None
+
+
+def print_step(step: Dict[str, Any]) -> None:
+    latency = step['latency']
+    if latency is None:
+        print(f"{step['concurrency']:>5} workers: no successful operations ({step['errors']} errors)")
+        return
+    print(f"{step['concurrency']:>5} workers: {step['throughput']:9.1f} ops/s  "
+          f"p50 {latency['median']['value']:8.2f}  p95 {latency['p95']['value']:8.2f}  "
+          f"p99 {latency['p99']['value']:8.2f} ms  errors {step['errors']}"
+          + (f"  [yellow]({step['late_workers']} workers started late)[/yellow]" if step['late_workers'] else ''))
+    if step['first_error']:
+        print(f"       first error: {step['first_error']}")
+
+
+def run_load(concurrency_steps: Sequence[int], mix: Dict[str, float], duration: float = 10.0, rate: float = 0.0,
+             mode: str = 'thread', per_page: int = 20, max_page: int = 50, count_strategy: str = 'cached',
+             report_days: float = 7.0, seed: int = 42) -> Dict[str, Any]:
+    """
+    Run every concurrency step and return the saturation curve
+
+    Args:
+        concurrency_steps: Worker counts, one step each
+        mix: Operation weights (parse_mix)
+        duration: Seconds measured per step
+        rate: Target operations per second across all workers (0 runs closed loop, as fast as possible)
+        mode: 'thread' (one shared pool) or 'process' (a pool per worker process)
+        per_page: Rows per pagination page
+        max_page: Pages are drawn uniformly from 1..max_page
+        count_strategy: paginate_query count strategy
+        report_days: Length of each report date range
+        seed: Random seed for operation choice and parameters
+
+    Returns:
+        {'config', 'steps', 'saturation_concurrency'}
+    """
+    config = dict(workload_parameters(), mix=mix, duration=duration, rate=rate, per_page=per_page,
+                  max_page=max_page, count_strategy=count_strategy, report_days=report_days, seed=seed)
+    steps = []
+    for concurrency in concurrency_steps:
+        step = run_step(concurrency, config, mode)
+        print_step(step)
+        steps.append(step)
+    config.pop('asset_names')
+    import db
+    return {'config': dict(config, mode=mode, pool_size=db.POOL_SIZE, max_overflow=db.MAX_OVERFLOW,
+                           pooler_mode=db.POOLER_MODE),
+            'steps': steps, 'saturation_concurrency': saturation_point(steps)}
+
+
+def write_plot(curve: Dict[str, Any], path: str) -> None:
+    """Throughput vs. latency percentiles, one point per concurrency step (plotly HTML)"""
+    try:
+        import plotly.graph_objects as go
+    except ImportError as e:
+        raise ImportError("--plot requires plotly (pip install plotly)") from e
+
+    steps = [step for step in curve['steps'] if step['latency']]
+    figure = go.Figure()
+    for percentile in ('median', 'p95', 'p99'):
+        figure.add_trace(go.Scatter(
+            x=[step['throughput'] for step in steps],
+            y=[step['latency'][percentile]['value'] for step in steps],
+            text=[f"{step['concurrency']} workers" for step in steps],
+            mode='lines+markers', name='p50' if percentile == 'median' else percentile,
+        ))
+    figure.update_layout(title='Saturation curve', xaxis_title='Throughput (ops/s)', yaxis_title='Latency (ms)')
+    figure.write_html(path)
+    print(f"Plot written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load generator with throughput-vs-latency curves")
+    parser.add_argument("--concurrency", type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help="workers per step")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="target operations per second across all workers (default: closed loop)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--processes", action="store_true", help="run workers as processes instead of threads")
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--max-page", type=int, default=50)
+    parser.add_argument("--count-strategy", default='cached', choices=('exact', 'estimate', 'cached', 'window'))
+    parser.add_argument("--report-days", type=float, default=7.0, help="length of each report date range")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pool-size", type=int, help="DB_POOL_SIZE for this run")
+    parser.add_argument("--max-overflow", type=int, help="DB_MAX_OVERFLOW for this run")
+    parser.add_argument("--pooler-mode", choices=('auto', 'session', 'transaction'), help="DB_POOLER_MODE for this run")
+    parser.add_argument("--output", help="write the curve as JSON")
+    parser.add_argument("--plot", help="write the curve as a plotly HTML file")
+    args = parser.parse_args()
+
+    # Pool settings are read from the environment when db.py is imported (also by worker processes)
+    for variable, value in (('DB_POOL_SIZE', args.pool_size), ('DB_MAX_OVERFLOW', args.max_overflow),
+                            ('DB_POOLER_MODE', args.pooler_mode)):
+        if value is not None:
+            os.environ[variable] = str(value)
+
+    curve = run_load(args.concurrency, parse_mix(args.mix), duration=args.duration, rate=args.rate,
+                     mode='process' if args.processes else 'thread', per_page=args.per_page, max_page=args.max_page,
+                     count_strategy=args.count_strategy, report_days=args.report_days, seed=args.seed)
+    saturation = curve['saturation_concurrency']
+    print(f"\nThroughput stopped scaling after {saturation} workers" if saturation
+          else "\nThroughput still scaling at the last step")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(curve, created_at=datetime.now(timezone.utc).isoformat()), f, indent=2, default=str)
+        print(f"Results written to {args.output}")
+    if args.plot:
+        write_plot(curve, args.plot)
@@ -1,64 +1,275 @@
-import os
-from typing import Dict, List, Optional, Any
-from sqlalchemy import create_engine, text, MetaData, inspect
+import re
+import json
+import time
+import base64
+import uuid
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Any, Iterator, Sequence, Tuple, Union
+from sqlalchemy import text, MetaData, inspect
 from sqlalchemy.engine import CursorResult
-from dotenv import load_dotenv
 from dataclasses import dataclass
 from rich import print
+from db import get_engine, cached_text
+from adaptive_batch import AdaptiveBatcher
+from row_formats import ROW_FORMATS, check_row_format, format_rows, to_dict
+from result_cache import ResultCache, tables_in_query
+from paging import (
+    COUNT_STRATEGIES, PaginationResult, query_key, params_key, count_key, cached_total, store_total,
+    clear_count_cache, offset_page_query, default_count_query, window_page_query, split_window_rows,
+)
+from single_flight import SingleFlight
+from instrumentation import QueryMetrics
+from plan_capture import PlanCapture, PlanStore, PLAN_STORE_PATH
+from bench import measure, query_case, print_result, write_results
 
-# Load environment variables from .env file
-load_dotenv()
-CONNECTION_STRING = os.getenv('DATABASE_URL')
+# Shared, pooled SQLAlchemy engine (pool settings come from DB_* environment variables)
+engine = get_engine()
 
-if not CONNECTION_STRING:
-    raise ValueError("DATABASE_URL environment variable not found")
+# PostgreSQL type OIDs -> columnar kind, for fetch_columnar
+_COLUMNAR_KINDS = {
+    16: 'bool',
+    20: 'int', 21: 'int', 23: 'int',
+    700: 'float', 701: 'float', 1700: 'float',
+    1082: 'date', 1114: 'timestamp', 1184: 'timestamptz',
+}
 
-# Create SQLAlchemy engine
-engine = create_engine(CONNECTION_STRING)
+# Optional result cache in front of fetch_one/fetch_all/paginate_query (see enable_result_cache)
+result_cache: Optional[ResultCache] = None
+
+# Optional de-duplication of concurrent identical reads (see enable_single_flight)
+single_flight: Optional[SingleFlight] = None
+
+# Optional latency histograms and slow-query log (see enable_instrumentation)
+query_metrics: Optional[QueryMetrics] = None
+
+# Optional sampled EXPLAIN ANALYZE capture (see enable_plan_capture)
+plan_capture: Optional[PlanCapture] = None
+
+# Only plain reads are cached or shared; data-modifying CTEs are not
+_CACHEABLE_PATTERN = re.compile(r'^\s*\(?\s*(select|with)\b', re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r'\b(insert|update|delete|merge)\b', re.IGNORECASE)
 
 @dataclass
-class PaginationResult:
-    """Pagination result container"""
-    items: List[Dict[str, Any]]
-    total: int
-    page: int
+class KeysetPage:
+    """Keyset (seek) pagination result container"""
+    items: List[Any]
     per_page: int
-    total_pages: int
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+def enable_result_cache(max_bytes: int = 64 * 1024 * 1024, ttl: float = 60.0) -> ResultCache:
+    """
+    Turn on the result cache for fetch_one/fetch_all/paginate_query
+    
+    Repeated reads with the same SQL text and parameters are answered from memory
+    until their TTL runs out, the LRU evicts them, or invalidate_tables() drops them.
+    Cached rows are shared between callers; treat them as read-only.
+    
+    Args:
+        max_bytes: Upper bound on the estimated size of all cached results
+        ttl: Seconds a cached result stays valid
+        
+    Returns:
+        The ResultCache (use .stats() for hit/miss counters)
+    """
+    global result_cache
+    result_cache = ResultCache(max_bytes=max_bytes, ttl=ttl)
+    return result_cache
+
+
+def disable_result_cache() -> None:
+    """Turn the result cache off and drop everything it holds"""
+    global result_cache
+    cache, result_cache = result_cache, None
+    if cache is not None:
+        cache.clear()
+
+
+def invalidate_tables(*tables: str) -> int:
+    """Drop cached results that read any of the given tables; call after writing to them"""
+    cache = result_cache
+    return cache.invalidate(*tables) if cache is not None else 0
+
+
+def enable_single_flight() -> SingleFlight:
+    """
+    Collapse concurrent identical reads into one database round trip
+    
+    While a fetch_one/fetch_all/fetch_columnar call with the same SQL text and
+    parameters is in flight, other threads wait for its result instead of running the
+    query again. The shared result must be treated as read-only.
+    
+    Returns:
+        The SingleFlight (use .stats() for executed/shared counters)
+    """
+    global single_flight
+    single_flight = SingleFlight()
+    return single_flight
+
+
+def disable_single_flight() -> None:
+    """Run every read independently again"""
+    global single_flight
+    single_flight = None
+
+
+def enable_instrumentation(slow_threshold: float = 0.5, slow_log_size: int = 100) -> QueryMetrics:
+    """
+    Record connect/execute/fetch latency histograms and row counts per statement fingerprint
+    
+    Execute and connect times come from engine events, so every query on the shared engine
+    is covered; fetch times are reported by fetch_one/fetch_all/stream_rows.
+    
+    Args:
+        slow_threshold: Seconds at or above which a statement goes to the slow-query log
+        slow_log_size: Slow-query log entries kept
+        
+    Returns:
+        The QueryMetrics (to_prometheus(), to_json(), slow_queries())
+    """
+    global query_metrics
+    disable_instrumentation()
+    query_metrics = QueryMetrics(slow_threshold=slow_threshold, slow_log_size=slow_log_size).attach(engine)
+    return query_metrics
+
+
+def disable_instrumentation() -> None:
+    """Detach the metrics from the engine"""
+    global query_metrics
+    metrics, query_metrics = query_metrics, None
+    if metrics is not None:
+        metrics.detach()
+
+
+def enable_plan_capture(sample_rate: float = 0.01, min_interval: float = 300.0,
+                        path: str = PLAN_STORE_PATH) -> PlanCapture:
+    """
+    Diagnostic mode: capture EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for queries run by
+    fetch_one/fetch_all/paginate_query (PostgreSQL, SELECT only)
+    
+    Each statement fingerprint is captured when first seen, then for `sample_rate` of
+    its executions at most once per `min_interval` seconds, on a background thread.
+    Plans go to a local SQLite plan store; a seq scan replacing an index scan, a new sort
+    or a large slowdown versus the last stored plan is flagged and logged.
+    
+    Args:
+        sample_rate: Fraction of executions considered for capture
+        min_interval: Minimum seconds between captures of the same fingerprint
+        path: Plan store file (default: PLAN_STORE_PATH)
+        
+    Returns:
+        The PlanCapture (its .store has latest_all(), history(), regressions())
+    """
+    global plan_capture
+    disable_plan_capture()
+    plan_capture = PlanCapture(engine, PlanStore(path), sample_rate=sample_rate, min_interval=min_interval)
+    return plan_capture
+
+
+def disable_plan_capture() -> None:
+    """Stop capturing plans (waits for captures already scheduled)"""
+    global plan_capture
+    capture, plan_capture = plan_capture, None
+    if capture is not None:
+        capture.close()
+
+
+def _is_read_query(query: str) -> bool:
+    return bool(_CACHEABLE_PATTERN.match(query)) and not _WRITE_PATTERN.search(query)
 
-def fetch_one(query: str, params: Optional[Dict] = None) -> Optional[Dict]:
+
+def _shared_fetch(kind: str, query: str, params: Optional[Dict], variant: str, use_cache: bool, load):
+    """
+    Run a read through the result cache and single-flight layers, when enabled
+    
+    A cache hit skips the database; on a miss, concurrent identical callers share one
+    execution of `load()` and its result is cached once.
+    """
+    cache = result_cache if use_cache else None
+    flight = single_flight
+    if (cache is None and flight is None) or not _is_read_query(query):
+        return load()
+    key = (kind, query_key(query), params_key(params), variant)
+    if cache is not None:
+        hit, value = cache.get(key)
+        if hit:
+            return value
+
+    def load_and_store():
+        value = load()
+        if cache is not None:
+            cache.put(key, value, tables=tables_in_query(query))
+        return value
+
+    return flight.do(key, load_and_store) if flight is not None else load_and_store()
+
+
+def fetch_one(query: str, params: Optional[Dict] = None, row_format: str = 'dict',
+              use_cache: bool = True) -> Optional[Any]:
     """
     Fetch a single row from a query
     
     Args:
         query: SQL query string
         params: Optional query parameters
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+        use_cache: Consult the result cache when it is enabled
         
     Returns:
-        Dictionary containing the first row of results, or None if no results
+        The first row of results in the requested format, or None if no results
     """
+    check_row_format(row_format)
+    return _shared_fetch('one', query, params, row_format, use_cache,
+                         lambda: _fetch_one(query, params, row_format))
+
+
+def _fetch_one(query: str, params: Optional[Dict], row_format: str) -> Optional[Any]:
+    metrics = query_metrics
     with engine.connect() as conn:
-        result = conn.execute(text(query), params or {})
+        result = conn.execute(cached_text(query), params or {})
+        start_time = time.perf_counter()
         row = result.fetchone()
-        if not row:
-            return None
-        return dict(zip(result.keys(), row))
+        item = format_rows(list(result.keys()), [row], row_format)[0] if row else None
+        if metrics is not None:
+            metrics.observe('fetch', query, time.perf_counter() - start_time, 1 if row else 0)
+    if plan_capture is not None:
+        plan_capture.observe(query, params)
+    return item
 
 
-def fetch_all(query: str, params: Optional[Dict] = None) -> List[Dict]:
+def fetch_all(query: str, params: Optional[Dict] = None, row_format: str = 'dict',
+              use_cache: bool = True) -> List[Any]:
     """
     Fetch all rows from a query
     
     Args:
         query: SQL query string
         params: Optional query parameters
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class);
+                    the non-dict formats avoid repeating the column names in every row
+        use_cache: Consult the result cache when it is enabled
         
     Returns:
-        List of dictionaries, each representing a row
+        List of rows in the requested format (dictionaries by default)
     """
+    check_row_format(row_format)
+    return _shared_fetch('all', query, params, row_format, use_cache,
+                         lambda: _fetch_all(query, params, row_format))
+
+
+def _fetch_all(query: str, params: Optional[Dict], row_format: str) -> List[Any]:
+    metrics = query_metrics
     with engine.connect() as conn:
-        result = conn.execute(text(query), params or {})
-        columns = result.keys()
-        return [dict(zip(columns, row)) for row in result.fetchall()]
+        result = conn.execute(cached_text(query), params or {})
+        start_time = time.perf_counter()
+        items = format_rows(list(result.keys()), result.fetchall(), row_format)
+        if metrics is not None:
+            metrics.observe('fetch', query, time.perf_counter() - start_time, len(items))
+    if plan_capture is not None:
+        plan_capture.observe(query, params)
+    return items
 
 
 def fetch_one_many_all(query: str, params: Optional[Dict] = None) -> tuple:
@@ -73,19 +284,251 @@ def fetch_one_many_all(query: str, params: Optional[Dict] = None) -> tuple:
         tuple: (first_row, next_two_rows, remaining_rows)
     """
     with engine.connect() as conn:
-        result = conn.execute(text(query), params or {})
+        result = conn.execute(cached_text(query), params or {})
         first = result.fetchone()
         next_two = result.fetchmany(2)
         remaining = result.fetchall()
         return first, next_two, remaining
 
 
+def stream_rows(
+    query: str,
+    params: Optional[Dict] = None,
+    chunk_size: Union[int, AdaptiveBatcher] = 1000,
+    chunks: bool = False,
+    row_format: str = 'dict'
+) -> Iterator:
+    """
+    Stream rows from a query through a server-side cursor
+    
+    Rows are pulled from the server `chunk_size` at a time, so memory stays flat
+    however large the result is. The connection is held until the generator is
+    exhausted or closed.
+    
+    Args:
+        query: SQL query string
+        params: Optional query parameters
+        chunk_size: Rows fetched per round trip, or an AdaptiveBatcher that tunes it
+        chunks: Yield lists of rows (one per fetch) instead of single rows
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+        
+    Yields:
+        Rows in the requested format (or lists of them when chunks=True)
+    """
+    check_row_format(row_format)
+    batcher = chunk_size if isinstance(chunk_size, AdaptiveBatcher) else None
+    buffer_size = batcher.max_size if batcher else chunk_size
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=buffer_size).execute(
+            cached_text(query), params or {}
+        )
+        columns = list(result.keys())
+        metrics = query_metrics
+        fetch_seconds, row_count = 0.0, 0
+        try:
+            while True:
+                start_time = time.perf_counter()
+                rows = result.fetchmany(batcher.size if batcher else chunk_size)
+                elapsed = time.perf_counter() - start_time
+                fetch_seconds += elapsed
+                if not rows:
+                    break
+                row_count += len(rows)
+                if batcher:
+                    batcher.record(rows, elapsed)
+                chunk = format_rows(columns, rows, row_format)
+                if chunks:
+                    yield chunk
+                else:
+                    yield from chunk
+        finally:
+            if metrics is not None:
+                # Server-side cursors report no rowcount at execute, so rows are counted here
+                metrics.observe('fetch', query, fetch_seconds, row_count, count_rows=True)
+
+
+def _mogrify(raw_conn, query: str, params: Optional[Dict]) -> str:
+    """Render a :named-parameter query with its parameters bound client-side"""
+    compiled = cached_text(query).compile(dialect=engine.dialect)
+    bind = compiled.construct_params(params or {})
+    if type(raw_conn).__module__.startswith('psycopg2'):
+        rendered = raw_conn.cursor().mogrify(str(compiled), bind)
+    else:  # psycopg 3
+        import psycopg
+        rendered = psycopg.ClientCursor(raw_conn).mogrify(str(compiled), bind)
+    return rendered.decode() if isinstance(rendered, bytes) else rendered
+
+
+def _copy_out(raw_conn, copy_sql: str) -> io.BytesIO:
+    """Run COPY ... TO STDOUT and collect the output in memory"""
+    buffer = io.BytesIO()
+    cursor = raw_conn.cursor()
+    if hasattr(cursor, 'copy_expert'):  # psycopg2
+        cursor.copy_expert(copy_sql, buffer)
+    else:  # psycopg 3
+        with cursor.copy(copy_sql) as copy:
+            for data in copy:
+                buffer.write(data)
+    buffer.seek(0)
+    return buffer
+
+
+def fetch_columnar(query: str, params: Optional[Dict] = None, backend: str = 'numpy'):
+    """
+    Fetch a query result column by column, without building per-row Python objects
+    
+    On PostgreSQL the result is streamed with COPY (...) TO STDOUT (FORMAT csv) and parsed
+    by a C CSV reader (pandas, or pyarrow for backend='arrow') into typed columns.
+    Timestamps with time zone come back as UTC and numeric as float64.
+    Other databases fall back to pandas.read_sql_query.
+    
+    Args:
+        query: SQL query string
+        params: Optional query parameters
+        backend: 'numpy' (dict of column name -> ndarray), 'pandas' (DataFrame)
+                 or 'arrow' (pyarrow.Table, requires pyarrow)
+        
+    Returns:
+        Columns in the requested backend's container
+    """
+    if backend not in ('numpy', 'pandas', 'arrow'):
+        raise ValueError(f"Unknown columnar backend: {backend}")
+    # Columns are not kept in the result cache; concurrent identical calls are still shared
+    return _shared_fetch('columnar', query, params, backend, False,
+                         lambda: _fetch_columnar(query, params, backend))
+
+
+def _fetch_columnar(query: str, params: Optional[Dict], backend: str):
+    import pandas as pd
+
+    if engine.dialect.name != 'postgresql':
+        with engine.connect() as conn:
+            df = pd.read_sql_query(cached_text(query), conn, params=params or {})
+        if backend == 'arrow':
+            import pyarrow as pa
+            return pa.Table.from_pandas(df, preserve_index=False)
+        return df if backend == 'pandas' else {col: df[col].to_numpy() for col in df.columns}
+
+    raw_conn = engine.raw_connection()
+    try:
+        bound_query = _mogrify(raw_conn.driver_connection, query, params)
+
+        # Column names and types without fetching any rows
+        cursor = raw_conn.cursor()
+        cursor.execute(f"SELECT * FROM ({bound_query}) AS columnar LIMIT 0")
+        columns = [(col.name, _COLUMNAR_KINDS.get(col.type_code, 'text')) for col in cursor.description]
+        cursor.close()
+
+        select_list = []
+        for name, kind in columns:
+            quoted = _quote_identifier(name)
+            if kind == 'timestamptz':
+                select_list.append(f"to_char({quoted} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US') AS {quoted}")
+            elif kind == 'float':
+                select_list.append(f"{quoted}::float8 AS {quoted}")
+            else:
+                select_list.append(quoted)
+        copy_sql = (
+            f"COPY (SELECT {', '.join(select_list)} FROM ({bound_query}) AS columnar) "
+            f"TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\\N')"
+        )
+        buffer = _copy_out(raw_conn.driver_connection, copy_sql)
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+    names = [name for name, _ in columns]
+    time_columns = [name for name, kind in columns if kind in ('date', 'timestamp', 'timestamptz')]
+
+    if backend == 'arrow':
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError as e:
+            raise ImportError("backend='arrow' requires pyarrow (pip install pyarrow)") from e
+        arrow_types = {
+            'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(), 'date': pa.date32(),
+            'timestamp': pa.timestamp('us'), 'timestamptz': pa.timestamp('us', tz='UTC'),
+        }
+        return pa_csv.read_csv(
+            buffer,
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: arrow_types.get(kind, pa.string()) for name, kind in columns},
+                null_values=['\\N'],
+                true_values=['t'],
+                false_values=['f'],
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+
+    pandas_types = {'bool': 'boolean', 'int': 'Int64', 'float': 'float64'}
+    df = pd.read_csv(
+        buffer,
+        dtype={name: pandas_types.get(kind, 'object') for name, kind in columns if name not in time_columns},
+        na_values=['\\N'],
+        keep_default_na=False,
+        true_values=['t'],
+        false_values=['f'],
+    )
+    for name, kind in columns:
+        if kind in ('date', 'timestamp', 'timestamptz'):
+            df[name] = pd.to_datetime(df[name], format='ISO8601', utc=(kind == 'timestamptz'))
+    if backend == 'pandas':
+        return df
+
+    arrays = {}
+    for name, kind in columns:
+        series = df[name]
+        if kind == 'int':
+            arrays[name] = series.to_numpy('float64', na_value=float('nan')) if series.hasnans else series.to_numpy('int64')
+        elif kind == 'bool':
+            arrays[name] = series.to_numpy('object', na_value=None) if series.hasnans else series.to_numpy('bool')
+        elif kind == 'timestamptz':
+            # datetime64 in UTC (NumPy has no time zone aware dtype)
+            arrays[name] = series.dt.tz_convert(None).to_numpy()
+        else:
+            arrays[name] = series.to_numpy()
+    return dict(zip(names, (arrays[name] for name in names)))
+
+
+def estimate_count(query: str, params: Optional[Dict] = None) -> int:
+    """
+    Planner row estimate for a query (no table scan)
+
+    Uses EXPLAIN's top-level "Plan Rows", which for a bare table comes from
+    pg_class.reltuples and is only as fresh as the last ANALYZE/autovacuum.
+    """
+    row = fetch_one(f"EXPLAIN (FORMAT JSON) {query}", params)
+    plan = next(iter(row.values()))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(count_query: str, params: Optional[Dict] = None, ttl: float = 60.0) -> int:
+    """Exact count, reused for `ttl` seconds per count query text and parameters"""
+    key = count_key(count_query, params)
+    total = cached_total(key)
+    if total is not None:
+        return total
+
+    # Bypasses the result cache: the count has its own TTL here
+    total = fetch_one(count_query, params, use_cache=False)['count']
+    store_total(key, total, ttl)
+    return total
+
+
 def paginate_query(
     query: str,
     page: int = 1,
     per_page: int = 100,
     params: Optional[Dict] = None,
-    count_query: Optional[str] = None
+    count_query: Optional[str] = None,
+    count_strategy: str = 'exact',
+    count_ttl: float = 60.0,
+    row_format: str = 'dict',
+    use_cache: bool = True
 ) -> PaginationResult:
     """
     Execute a paginated query
@@ -97,27 +540,60 @@ def paginate_query(
         params: Query parameters
         count_query: Optional custom count query. If not provided, 
                    will be generated from the base query
+        count_strategy: How the total is obtained:
+                        'exact' runs the count query on every call,
+                        'estimate' uses the planner's row estimate (PostgreSQL only; no scan),
+                        'cached' runs the count query and reuses it for `count_ttl` seconds,
+                        'window' returns the page and the total in one round trip
+                        via a COUNT(*) OVER() column (reads the whole result on every
+                        page; ORDER BY keys must be output column names)
+        count_ttl: Seconds a cached total stays valid (count_strategy='cached')
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+        use_cache: Consult the result cache (page and total are cached separately)
     
     Returns:
-        PaginationResult object with items and pagination info
+        PaginationResult object with items and pagination info;
+        total_is_exact is False when the total is a planner estimate
     """
+    if count_strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Unknown count strategy: {count_strategy}")
+    check_row_format(row_format)
+
     if page < 1:
         page = 1
     
     offset = (page - 1) * per_page
     
-    # Add pagination to the query
-    paginated_query = f"{query} LIMIT {per_page} OFFSET {offset}"
+    if count_strategy == 'window':
+        # Page and total in one statement; the window is computed before LIMIT/OFFSET
+        paginated_query = window_page_query(query, per_page, offset)
+    else:
+        # Add pagination to the query
+        paginated_query = offset_page_query(query, per_page, offset)
     
     # Execute the paginated query
-    items = fetch_all(paginated_query, params)
+    if count_strategy == 'window':
+        rows = fetch_all(paginated_query, params, row_format='row', use_cache=use_cache)
+        items, window_total = split_window_rows(rows, row_format)
+    else:
+        items = fetch_all(paginated_query, params, row_format=row_format, use_cache=use_cache)
     
     # Get total count
     if not count_query:
         # Simple count query generation (may not work for all SQL)
-        count_query = f"SELECT COUNT(*) AS count FROM ({query}) AS subquery"
+        count_query = default_count_query(query)
     
-    total = fetch_one(count_query, params)['count']
+    total_is_exact = True
+    if count_strategy == 'window' and window_total is not None:
+        total = window_total
+    elif count_strategy == 'estimate' and engine.dialect.name == 'postgresql':
+        total = estimate_count(query, params)
+        total_is_exact = False
+    elif count_strategy == 'cached':
+        total = cached_count(count_query, params, count_ttl)
+    else:
+        # 'exact', or 'window' past the last page where no row carries the total
+        total = fetch_one(count_query, params, use_cache=use_cache)['count']
     total_pages = (total + per_page - 1) // per_page
     
     return PaginationResult(
@@ -125,19 +601,223 @@ def paginate_query(
         total=total,
         page=page,
         per_page=per_page,
-        total_pages=total_pages
+        total_pages=total_pages,
+        total_is_exact=total_is_exact
+    )
+
+
+def _parse_sort_key(sort_key: str) -> Tuple[str, bool]:
+    """Split 'column [ASC|DESC]' into (column, descending)"""
+    parts = sort_key.split()
+    if len(parts) == 2 and parts[1].upper() in ('ASC', 'DESC'):
+        return parts[0], parts[1].upper() == 'DESC'
+    if len(parts) != 1:
+        raise ValueError(f"Invalid sort key: {sort_key!r}")
+    return parts[0], False
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _encode_key_value(value: Any) -> Any:
+    """Make a sort key value JSON serializable without losing its type"""
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    if isinstance(value, uuid.UUID):
+        return {'$uuid': str(value)}
+    return value
+
+
+def _decode_key_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if '$dt' in value:
+            return datetime.fromisoformat(value['$dt'])
+        if '$d' in value:
+            return date.fromisoformat(value['$d'])
+        if '$dec' in value:
+            return Decimal(value['$dec'])
+        if '$uuid' in value:
+            return uuid.UUID(value['$uuid'])
+    return value
+
+
+def encode_cursor(key_values: Sequence[Any], direction: str = 'next') -> str:
+    """Encode sort key values into an opaque, URL-safe cursor token"""
+    payload = json.dumps({'k': [_encode_key_value(v) for v in key_values], 'd': direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[List[Any], str]:
+    """Decode a cursor token into (sort key values, direction)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return [_decode_key_value(v) for v in payload['k']], payload['d']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+def paginate_keyset(
+    query: str,
+    order_by: Sequence[str],
+    unique_key: str,
+    per_page: int = 100,
+    cursor: Optional[str] = None,
+    params: Optional[Dict] = None,
+    row_format: str = 'dict'
+) -> KeysetPage:
+    """
+    Execute a keyset (seek) paginated query
+
+    Instead of OFFSET, each page continues from the sort key values of the previous
+    page's edge row, so late pages cost the same as the first one when an index
+    matches the sort order (e.g. (timestamp DESC, asset_name DESC)).
+
+    Args:
+        query: Base SQL query (without ORDER BY/LIMIT/OFFSET)
+        order_by: Sort keys, e.g. ["timestamp DESC"]; columns must be NOT NULL
+        unique_key: Unique tiebreak column appended to the sort keys
+                    (takes the direction of the last sort key unless given, e.g. "asset_name DESC")
+        per_page: Items per page
+        cursor: next_cursor/prev_cursor from a previous page, or None for the first page
+        params: Query parameters
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+
+    Returns:
+        KeysetPage object with items and next/previous cursors
+    """
+    check_row_format(row_format)
+    keys = [_parse_sort_key(k) for k in order_by]
+    tiebreak_col, tiebreak_desc = _parse_sort_key(unique_key)
+    if len(unique_key.split()) == 1 and keys:
+        tiebreak_desc = keys[-1][1]
+    keys.append((tiebreak_col, tiebreak_desc))
+
+    direction = 'next'
+    key_values = None
+    if cursor:
+        key_values, direction = decode_cursor(cursor)
+        if len(key_values) != len(keys) or direction not in ('next', 'prev'):
+            raise ValueError("Pagination cursor does not match the sort keys")
+
+    # Walking backwards flips every sort direction; the page is reversed afterwards
+    seek_keys = [(col, desc if direction == 'next' else not desc) for col, desc in keys]
+
+    query_params = dict(params or {})
+    where = ''
+    if key_values is not None:
+        for i, value in enumerate(key_values):
+            query_params[f'_keyset_{i}'] = value
+        if len({desc for _, desc in seek_keys}) == 1:
+            # Uniform direction: row value comparison, matches a composite index directly
+            op = '<' if seek_keys[0][1] else '>'
+            cols = ', '.join(_quote_identifier(col) for col, _ in seek_keys)
+            binds = ', '.join(f':_keyset_{i}' for i in range(len(seek_keys)))
+            where = f"WHERE ({cols}) {op} ({binds})"
+        else:
+            # Mixed directions: (k1 op v1) OR (k1 = v1 AND k2 op v2) OR ...
+            clauses = []
+            for i, (col, desc) in enumerate(seek_keys):
+                equal = [f"{_quote_identifier(c)} = :_keyset_{j}" for j, (c, _) in enumerate(seek_keys[:i])]
+                equal.append(f"{_quote_identifier(col)} {'<' if desc else '>'} :_keyset_{i}")
+                clauses.append('(' + ' AND '.join(equal) + ')')
+            where = 'WHERE ' + ' OR '.join(clauses)
+
+    order = ', '.join(f"{_quote_identifier(col)} {'DESC' if desc else 'ASC'}" for col, desc in seek_keys)
+    keyset_query = f"SELECT * FROM ({query}) AS keyset_page {where} ORDER BY {order} LIMIT {per_page + 1}"
+
+    rows = fetch_all(keyset_query, query_params, row_format='row')
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    def cursor_for(row, cursor_direction: str) -> str:
+        return encode_cursor([row._mapping[col] for col, _ in keys], cursor_direction)
+
+    if direction == 'next':
+        next_cursor = cursor_for(rows[-1], 'next') if has_more else None
+        prev_cursor = cursor_for(rows[0], 'prev') if cursor and rows else None
+    else:
+        next_cursor = cursor_for(rows[-1], 'next') if rows else None
+        prev_cursor = cursor_for(rows[0], 'prev') if has_more else None
+
+    return KeysetPage(
+        items=format_rows(list(rows[0]._fields) if rows else [], rows, row_format),
+        per_page=per_page,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
     )
 
 
+def fetch_latest_by_key(
+    table: str,
+    key_column: str,
+    keys: Sequence[Any],
+    order_column: str = 'timestamp',
+    row_format: str = 'dict',
+    use_cache: bool = True
+) -> Dict[Any, Any]:
+    """
+    Fetch the latest row for each of many keys in one round trip
+    
+    On PostgreSQL this is one `SELECT DISTINCT ON (key) ... WHERE key = ANY(:keys)
+    ORDER BY key, order_column DESC`; other databases use ROW_NUMBER() over an IN list.
+    
+    Args:
+        table: Table name
+        key_column: Column the lookups are keyed on (e.g. asset_name)
+        keys: Key values to look up
+        order_column: Column deciding which row is the latest
+        row_format: 'dict', 'tuple', 'row' (SQLAlchemy Row) or 'record' (__slots__ class)
+        use_cache: Consult the result cache when it is enabled
+        
+    Returns:
+        Dictionary of key -> latest row; keys without rows are absent
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    table_sql, key_sql, order_sql = (_quote_identifier(name) for name in (table, key_column, order_column))
+
+    if engine.dialect.name == 'postgresql':
+        query = (
+            f"SELECT DISTINCT ON ({key_sql}) * FROM {table_sql} "
+            f"WHERE {key_sql} = ANY(:keys) ORDER BY {key_sql}, {order_sql} DESC"
+        )
+        rows = fetch_all(query, {'keys': keys}, row_format='row', use_cache=use_cache)
+        strip = 0
+    else:
+        params = {f'key_{i}': key for i, key in enumerate(keys)}
+        placeholders = ', '.join(f':{name}' for name in params)
+        query = (
+            f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY {key_sql} ORDER BY {order_sql} DESC) "
+            f"AS _latest_rank FROM {table_sql} WHERE {key_sql} IN ({placeholders})) AS latest "
+            f"WHERE _latest_rank = 1"
+        )
+        rows = fetch_all(query, params, row_format='row', use_cache=use_cache)
+        strip = 1  # drop the _latest_rank column
+
+    if not rows:
+        return {}
+    columns = list(rows[0]._fields[:len(rows[0]._fields) - strip])
+    key_index = columns.index(key_column)
+    # SQLAlchemy Rows are kept as-is (rank column included); other formats drop it
+    items = rows if row_format == 'row' else format_rows(columns, [row[:len(columns)] for row in rows], row_format)
+    return {row[key_index]: item for row, item in zip(rows, items)}
+
+
 def row_to_dict(row):
-    """Convert SQLAlchemy row to dictionary"""
+    """Convert SQLAlchemy row (or any fetch_* row format) to dictionary"""
     if row is None:
         return None
-    if hasattr(row, '_asdict'):  # For SQLAlchemy 1.4+
-        return row._asdict()
-    elif hasattr(row, '_mapping'):  # For SQLAlchemy 1.4+ with future=True
-        return dict(row._mapping)
-    return dict(row)  # Fallback
+    # The conversion is resolved once per row type instead of probed on every call
+    return to_dict(row)
 
 
 def example_queries() -> None:
@@ -181,46 +861,218 @@ def example_queries() -> None:
     print("BTC details:", row_to_dict(result) if result else "Not found")
 
 
-def benchmark_query(table_name: str, limit: int = 1000) -> Dict[str, Any]:
+    # Example 4: Keyset pagination (constant cost for deep pages)
+    print("\n --> Example 4: Keyset Pagination")
+    page = paginate_keyset(
+        "SELECT * FROM asset_master",
+        order_by=["timestamp DESC"],
+        unique_key="asset_name",
+        per_page=20
+    )
+    page = paginate_keyset(
+        "SELECT * FROM asset_master",
+        order_by=["timestamp DESC"],
+        unique_key="asset_name",
+        per_page=20,
+        cursor=page.next_cursor
+    )
+    print(f"Showing {len(page.items)} items, has next page: {page.next_cursor is not None}")
+    print("First item:", page.items[0] if page.items else "No items")
+
+
+def benchmark_query(table_name: str, limit: int = 1000, stream: bool = False, iterations: int = 5,
+                    warmup: int = 1, row_format: str = 'row') -> Dict[str, Any]:
     """
-    Execute a benchmark query and return timing information
-    
+    Benchmark SELECT * ... LIMIT on a table with bench.py, timing each phase separately
+
     Args:
         table_name: Name of the table to query
         limit: Maximum number of rows to return
+        stream: Fetch through a server-side cursor in chunks instead of one fetchall()
+        iterations: Recorded runs
+        warmup: Unrecorded runs before them
+        row_format: Format rows are decoded into ('row' keeps the driver rows)
+
+    Returns:
+        Dict containing benchmark results; execution_time is the median total in seconds
+        and 'benchmark' holds the full bench.measure() result (per-phase percentiles and CIs)
+    """
+    query = f"SELECT * FROM {table_name} LIMIT {limit}"
+    result = measure(
+        f"{table_name} limit={limit}" + (" stream" if stream else ""),
+        query_case(query, row_format=row_format, stream=stream),
+        iterations=iterations, warmup=warmup,
+        metadata={'query': query, 'row_format': row_format, 'stream': stream},
+    )
+    execution_time = result['phases']['total']['median']['value'] / 1000
+    rows_returned = result['extra']['rows']
+
+    return {
+        'execution_time': execution_time,
+        'rows_returned': rows_returned,
+        'table': table_name,
+        'limit': limit,
+        'rows_per_second': rows_returned / execution_time if execution_time > 0 else 0,
+        'benchmark': result,
+    }
+
+
+def benchmark_pagination(
+    query: str = "SELECT * FROM asset_master ORDER BY timestamp DESC",
+    page: int = 3,
+    per_page: int = 20,
+    iterations: int = 10,
+    strategies: Sequence[str] = ('exact', 'window')
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare page latency of paginate_query count strategies
+    
+    Args:
+        query: Base SQL query (without LIMIT/OFFSET)
+        page: Page number to fetch
+        per_page: Items per page
+        iterations: Timed runs per strategy (after one warm-up run)
+        strategies: Count strategies to compare
         
     Returns:
-        Dict containing benchmark results
+        Dict of strategy -> {'median': seconds, 'min': seconds, 'max': seconds}
     """
-    import time
+    import statistics
     
-    # Simple select query
-    query = f"SELECT * FROM {table_name} LIMIT {limit}"
+    results = {}
+    for strategy in strategies:
+        paginate_query(query, page=page, per_page=per_page, count_strategy=strategy)  # warm-up
+        timings = []
+        for _ in range(iterations):
+            start_time = time.perf_counter()
+            paginate_query(query, page=page, per_page=per_page, count_strategy=strategy)
+            timings.append(time.perf_counter() - start_time)
+        results[strategy] = {
+            'median': statistics.median(timings),
+            'min': min(timings),
+            'max': max(timings),
+        }
+        print(f"{strategy:>8}: median {results[strategy]['median'] * 1000:.1f} ms "
+              f"(min {results[strategy]['min'] * 1000:.1f} ms, max {results[strategy]['max'] * 1000:.1f} ms)")
+    return results
+
+
+def benchmark_row_formats(
+    query: str = "SELECT * FROM asset_master",
+    formats: Sequence[str] = ROW_FORMATS
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare build time and peak memory of the fetch_* row formats
+    
+    The rows are fetched once; each format is then built from the same driver rows,
+    timed without tracing and measured for peak memory with tracemalloc.
+    
+    Args:
+        query: SQL query string
+        formats: Row formats to compare
+        
+    Returns:
+        Dict of format -> {'build_seconds': float, 'peak_mb': float}
+    """
+    import gc
+    import tracemalloc
     
-    # Time the query
-    start_time = time.time()
     with engine.connect() as conn:
         result = conn.execute(text(query))
+        columns = list(result.keys())
         rows = result.fetchall()
+    print(f"{len(rows)} rows, {len(columns)} columns")
+    
+    results = {}
+    for row_format in formats:
+        gc.collect()
+        start_time = time.perf_counter()
+        built = format_rows(columns, rows, row_format)
+        build_seconds = time.perf_counter() - start_time
+        del built
+        gc.collect()
+        
+        tracemalloc.start()
+        built = format_rows(columns, rows, row_format)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del built
+        
+        results[row_format] = {'build_seconds': build_seconds, 'peak_mb': peak / 1024 / 1024}
+        print(f"{row_format:>7}: {build_seconds:.3f} seconds, peak {results[row_format]['peak_mb']:.1f} MB")
+    return results
+
+
+def benchmark_statement_cache(
+    query: str = "SELECT * FROM asset_master WHERE asset_name = :asset_name ORDER BY timestamp DESC LIMIT 1",
+    params: Optional[Dict] = None,
+    iterations: int = 1000
+) -> Dict[str, float]:
+    """
+    Per-call cost of building text() vs. cached_text(), and of unprepared vs. prepared execution
     
-    execution_time = time.time() - start_time
+    Prepared execution is compared on psycopg 3 engines for the same database, with and
+    without prepared_statements; it needs a session pooler or direct connection.
     
-    return {
-        'execution_time': execution_time,
-        'rows_returned': len(rows),
-        'table': table_name,
-        'limit': limit,
-        'rows_per_second': len(rows) / execution_time if execution_time > 0 else 0
+    Args:
+        query: Hot parameterized SQL query
+        params: Query parameters (default: the first asset_name found)
+        iterations: Calls per measurement
+        
+    Returns:
+        Dict of measurement -> microseconds per call
+    """
+    from db import get_engine as get_configured_engine, resolve_pooler_mode
+    
+    if params is None:
+        params = {"asset_name": fetch_one("SELECT asset_name FROM asset_master LIMIT 1", use_cache=False)["asset_name"]}
+    
+    def per_call(fn) -> float:
+        fn()  # warm-up: connection checkout, compile cache, plan cache
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - start_time) / iterations * 1_000_000
+    
+    results = {
+        'text': per_call(lambda: text(query)),
+        'cached_text': per_call(lambda: cached_text(query)),
     }
+    print(f"text():        {results['text']:.2f} µs/call")
+    print(f"cached_text(): {results['cached_text']:.2f} µs/call "
+          f"(saves {results['text'] - results['cached_text']:.2f} µs/call)")
+    
+    url = engine.url
+    if url.get_backend_name() != 'postgresql':
+        print("Prepared statements: PostgreSQL only")
+        return results
+    url = url.set(drivername='postgresql+psycopg').render_as_string(hide_password=False)
+    if resolve_pooler_mode(url) == 'transaction':
+        print("Prepared statements: not available through the transaction pooler")
+        return results
+    
+    for label, prepared in (('unprepared', False), ('prepared', True)):
+        with get_configured_engine(url, prepared_statements=prepared).connect() as conn:
+            statement = cached_text(query)
+            results[label] = per_call(lambda: conn.execute(statement, params).fetchall())
+    print(f"Unprepared execute: {results['unprepared']:.1f} µs/call")
+    print(f"Prepared execute:   {results['prepared']:.1f} µs/call "
+          f"(saves {results['unprepared'] - results['prepared']:.1f} µs/call)")
+    return results
 
 
-def run_benchmark(table_names: List[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+def run_benchmark(table_names: List[str] = None, limit: int = 1000, stream: bool = False, iterations: int = 5,
+                  warmup: int = 1, output: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Run benchmark queries on specified tables
     
     Args:
         table_names: List of table names to benchmark (default: ['asset_master', 'asset_total_history_report'])
         limit: Maximum number of rows to fetch in each query
+        stream: Stream rows through a server-side cursor instead of loading them all
+        iterations: Recorded runs per table
+        warmup: Unrecorded runs per table before them
+        output: Write the results as JSON to this path (compare files with `python bench.py compare`)
         
     Returns:
         List of benchmark results
@@ -232,26 +1084,19 @@ def run_benchmark(table_names: List[str] = None, limit: int = 1000) -> List[Dict
     
     for table in table_names:
         try:
-            print(f"\n=== Benchmarking {table} ===")
-            
-            # Warm-up run
-            print("Running warm-up...")
-            benchmark_query(table, limit=1)
-            
-            # Actual benchmark
-            print("Running benchmark...")
-            result = benchmark_query(table, limit=limit)
+            result = benchmark_query(table, limit=limit, stream=stream, iterations=iterations, warmup=warmup)
             results.append(result)
             
             # Print results
-            print(f"Results for {table}:")
-            print(f"Execution time: {result['execution_time']:.4f} seconds")
-            print(f"Rows returned: {result['rows_returned']}")
-            print(f"Rows per second: {result['rows_per_second']:.2f}")
+            print_result(result['benchmark'])
+            print(f"Rows per second (median): {result['rows_per_second']:,.2f}")
             
         except Exception as e:
             print(f"Error benchmarking table {table}: {str(e)}")
     
+    if output and results:
+        write_results([result['benchmark'] for result in results], output)
+    
     return results
 
 
@@ -260,7 +1105,8 @@ if __name__ == "__main__":
     try:
         # Run benchmark
         print("\n**** Running Benchmarks ****")
-        run_benchmark(limit=10_000_000)
+        # Full-table scans: one recorded pass per table (use bench.py for repeated measurements)
+        run_benchmark(limit=10_000_000, stream=True, iterations=1, warmup=0)
         
         # Run example queries
         print("\n**** Example Queries ****")
@@ -1,27 +1,33 @@
 import sqlite3
 import os
-from sqlalchemy import create_engine, text
+import math
+import time
+import struct
+import hashlib
+import functools
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Optional
+from sqlalchemy import event, text
 from dotenv import load_dotenv
+from adaptive_batch import AdaptiveBatcher
+from db import get_engine, copy_from_buffer, rows_to_copy_buffer
 
 # Load environment variables from .env file
 load_dotenv()
 
-# SQLite3 DB 연결 [SOURCE]
+# SQLite3 DB 파일 [SOURCE]
 sqlite_db_file = 'myasset_sqlite3.db'
-conn_sqlite = sqlite3.connect(sqlite_db_file)
-cursor_sqlite = conn_sqlite.cursor()
 
 # SQLite3에서 이관할 데이터 조회 [SOURCE]
 select_query = "SELECT * FROM my_asset"
-cursor_sqlite.execute(select_query)
-
 
 # PostgreSQL DB 연결 [TARGET]
 POSTGRES_CONN_STRING = os.getenv('DATABASE_URL')
 if not POSTGRES_CONN_STRING:
     raise ValueError("DATABASE_URL not found in environment variables")
-
-engine_postgres = create_engine(POSTGRES_CONN_STRING)
 '''
 create table
   public.my_asset (
@@ -40,42 +46,729 @@ create table
   ) tablespace pg_default;
 '''
 
+# 이관 대상 컬럼 (SQLite3 my_asset 의 컬럼 순서와 동일)
+MY_ASSET_COLUMNS = [
+    "index", "div", "asset", "qty", "unit_usd",
+    "unit_krw", "total_krw", "asset_note", "timestamp",
+]
 
 # PosgreSQL DB insert query [TARGET]
 insert_query = text("""
-    INSERT INTO my_asset (index, div, asset, qty, unit_usd, unit_krw, total_krw, asset_note, timestamp) 
+    INSERT INTO my_asset (index, div, asset, qty, unit_usd, unit_krw, total_krw, asset_note, timestamp)
     VALUES (:index, :div, :asset, :qty, :unit_usd, :unit_krw, :total_krw, :asset_note, :timestamp)
 """)
 
-# 이관 배치 단위 
+# PostgreSQL COPY query [TARGET]
+copy_query = f"COPY my_asset ({', '.join(MY_ASSET_COLUMNS)}) FROM STDIN"
+
+# 전체 재적재용 스테이징 테이블 [TARGET]
+staging_table = "my_asset_staging"
+staging_ddl = f"""
+    CREATE UNLOGGED TABLE {staging_table} (
+        index smallint null,
+        div text null,
+        asset text null,
+        qty real null,
+        unit_usd real null,
+        unit_krw real null,
+        total_krw real null,
+        asset_note text null,
+        timestamp timestamp with time zone null,
+        seq uuid not null default gen_random_uuid ()
+    )
+"""
+staging_copy_query = f"COPY {staging_table} ({', '.join(MY_ASSET_COLUMNS)}) FROM STDIN"
+
+# my_asset 의 권한 / RLS 정책을 스테이징 테이블에 재현하는 문장 생성 [TARGET]
+staged_grants_query = """
+    SELECT format('GRANT %%s ON %%I TO %%s', privilege_type, %(staging)s,
+                  CASE WHEN grantee = 'PUBLIC' THEN 'PUBLIC' ELSE quote_ident(grantee) END)
+    FROM information_schema.role_table_grants
+    WHERE table_schema = current_schema() AND table_name = 'my_asset' AND grantee <> current_user
+"""
+staged_policies_query = """
+    SELECT format('CREATE POLICY %%I ON %%I AS %%s FOR %%s TO %%s', policyname, %(staging)s, permissive, cmd,
+                  (SELECT string_agg(CASE WHEN r = 'public' THEN 'PUBLIC' ELSE quote_ident(r) END, ', ')
+                   FROM unnest(roles) AS r))
+           || coalesce(' USING (' || qual || ')', '')
+           || coalesce(' WITH CHECK (' || with_check || ')', '')
+    FROM pg_policies
+    WHERE schemaname = current_schema() AND tablename = 'my_asset'
+"""
+staged_rls_query = "SELECT relrowsecurity, relforcerowsecurity FROM pg_class WHERE oid = to_regclass('my_asset')"
+
+# 증분 동기화 체크포인트 (high-water mark) [TARGET]
+checkpoint_ddl = """
+    CREATE TABLE IF NOT EXISTS migration_checkpoint (
+        source text PRIMARY KEY,
+        last_rowid bigint NOT NULL,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    )
+"""
+checkpoint_select = "SELECT last_rowid FROM migration_checkpoint WHERE source = %s"
+checkpoint_upsert = """
+    INSERT INTO migration_checkpoint (source, last_rowid) VALUES (%s, %s)
+    ON CONFLICT (source) DO UPDATE SET last_rowid = EXCLUDED.last_rowid, updated_at = now()
+"""
+
+# 이관 배치 단위 (adaptive_batching 이면 초기값)
 batch_size = 1000
+adaptive_batching = False
+
+# PostgreSQL 바인드 파라미터 최대 개수
+MAX_BIND_PARAMS = 65535
+
+
+def make_batcher(name: str = "batch", max_size: Optional[int] = None) -> AdaptiveBatcher:
+    """
+    Batch sizer for a read/write loop: adaptive when enabled, otherwise pinned to batch_size
+
+    Args:
+        name: Label for the adaptive batcher's log lines
+        max_size: Hard cap on the batch size (e.g. the bind parameter limit), applied in both
+                  modes; the adaptive search otherwise stops at 100,000 rows
+    """
+    size = min(batch_size, max_size) if max_size else batch_size
+    if adaptive_batching:
+        return AdaptiveBatcher(initial_size=min(size, max_size or 100_000), max_size=max_size or 100_000,
+                               name=name, verbose=True)
+    return AdaptiveBatcher(initial_size=size, min_size=size, max_size=size, name=name)
+
+
+def row_to_params(row) -> dict:
+    """Map a SQLite3 my_asset row to insert parameters"""
+    return dict(zip(MY_ASSET_COLUMNS, row[:len(MY_ASSET_COLUMNS)]))
+
+
+def _set_session_utc(dbapi_connection, connection_record):
+    # 커밋해야 풀 반환 시 rollback 으로 설정이 되돌려지지 않는다
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET TIME ZONE 'UTC'")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def get_target_engine(**kwargs):
+    """
+    Engine for the migration target, always on psycopg2 and with every session in UTC
+
+    DB_PREPARED_STATEMENTS=true would otherwise move the default engine to psycopg 3;
+    bulk loading gains nothing from prepared statements. Naive SQLite3 timestamps are
+    interpreted in the session time zone on load, and verify assumes that zone is UTC.
+    """
+    engine = get_engine(POSTGRES_CONN_STRING, prepared_statements=False, **kwargs)
+    if not event.contains(engine, 'connect', _set_session_utc):
+        event.listen(engine, 'connect', _set_session_utc)
+    return engine
+
+
+def build_values_insert(row_count: int):
+    """Build a multi-row VALUES insert for `row_count` rows"""
+    values = ", ".join(
+        "(" + ", ".join(f":{col}_{i}" for col in MY_ASSET_COLUMNS) + ")"
+        for i in range(row_count)
+    )
+    return text(f"INSERT INTO my_asset ({', '.join(MY_ASSET_COLUMNS)}) VALUES {values}")
+
+
+def migrate_row_by_row(cursor_sqlite, engine_postgres) -> int:
+    """Insert and commit one row at a time (original behaviour)"""
+    total = 0
+    while True:
+        batch = cursor_sqlite.fetchmany(batch_size)
+        if not batch:
+            break
+
+        # Execute insert query with parameterized values
+        with engine_postgres.connect() as conn_postgres:
+            print('.', end="", flush=True)
+            for row in batch:
+                conn_postgres.execute(insert_query, row_to_params(row))
+                conn_postgres.commit()
+        total += len(batch)
+    return total
+
+
+def copy_batches(cursor_sqlite, engine_postgres, query: str = copy_query, name: str = "copy"):
+    """COPY every remaining batch of `cursor_sqlite`, yielding the size of each committed batch"""
+    batcher = make_batcher(name)
+    raw_conn = engine_postgres.raw_connection()
+    try:
+        cursor_postgres = raw_conn.cursor()
+        while True:
+            start_time = time.perf_counter()
+            batch = cursor_sqlite.fetchmany(batcher.size)
+            if not batch:
+                break
+            copy_from_buffer(cursor_postgres, query, rows_to_copy_buffer(row[:len(MY_ASSET_COLUMNS)] for row in batch))
+            raw_conn.commit()
+            batcher.record(batch, time.perf_counter() - start_time)
+            yield len(batch)
+        cursor_postgres.close()
+    finally:
+        raw_conn.close()
+    if adaptive_batching:
+        print(batcher.summary(), flush=True)
+
 
-# Fetch data from SQLite and insert into PostgreSQL
-while True:
-    batch = cursor_sqlite.fetchmany(batch_size)
-    if not batch:
-        break
-    
-    # Prepare data for insertion
-    rows = [row for row in batch]
-   
-    # Execute insert query with parameterized values
+def migrate_copy(cursor_sqlite, engine_postgres) -> int:
+    """Stream each batch with COPY ... FROM STDIN and commit once per batch"""
+    total = 0
+    for copied in copy_batches(cursor_sqlite, engine_postgres):
+        total += copied
+        print('.', end="", flush=True)
+    return total
+
+
+def migrate_values(cursor_sqlite, engine_postgres) -> int:
+    """Insert each batch as a single multi-row VALUES statement"""
+    total = 0
+    batcher = make_batcher("values", max_size=MAX_BIND_PARAMS // len(MY_ASSET_COLUMNS))
     with engine_postgres.connect() as conn_postgres:
-        print('.', end="")
-        for row in rows:
-            # Execute the insert query
-            conn_postgres.execute(insert_query, {
-                "index": row[0],
-                "div": row[1],
-                "asset": row[2],
-                "qty": row[3],
-                "unit_usd": row[4],
-                "unit_krw": row[5],
-                "total_krw": row[6],
-                "asset_note": row[7],
-                "timestamp": row[8]
-            })
+        while True:
+            start_time = time.perf_counter()
+            batch = cursor_sqlite.fetchmany(batcher.size)
+            if not batch:
+                break
+            params = {}
+            for i, row in enumerate(batch):
+                for col, value in row_to_params(row).items():
+                    params[f"{col}_{i}"] = value
+            conn_postgres.execute(build_values_insert(len(batch)), params)
             conn_postgres.commit()
+            batcher.record(batch, time.perf_counter() - start_time)
+            total += len(batch)
+            print('.', end="", flush=True)
+    if adaptive_batching:
+        print(batcher.summary())
+    return total
+
+
+def rowid_ranges(conn_sqlite, workers: int) -> list:
+    """Split my_asset into `workers` contiguous, inclusive rowid ranges"""
+    min_rowid, max_rowid = conn_sqlite.execute("SELECT min(rowid), max(rowid) FROM my_asset").fetchone()
+    if min_rowid is None:
+        return []
+    span = max_rowid - min_rowid + 1
+    step = -(-span // workers)  # ceil
+    return [
+        (lo, min(lo + step - 1, max_rowid))
+        for lo in range(min_rowid, max_rowid + 1, step)
+    ]
+
+
+def migrate_rowid_range(worker_id: int, lo: int, hi: int, worker_batch_size: int, worker_adaptive: bool = False) -> int:
+    """Worker: COPY the rows with rowid in [lo, hi] using its own SQLite3 reader and PostgreSQL connection"""
+    global batch_size, adaptive_batching
+    batch_size = worker_batch_size
+    adaptive_batching = worker_adaptive
+
+    conn_sqlite = sqlite3.connect(sqlite_db_file)
+    engine_postgres = get_target_engine(pool_size=1, max_overflow=0)
+    try:
+        expected = conn_sqlite.execute(
+            "SELECT count(*) FROM my_asset WHERE rowid BETWEEN ? AND ?", (lo, hi)
+        ).fetchone()[0]
+        cursor_sqlite = conn_sqlite.cursor()
+        cursor_sqlite.execute(f"{select_query} WHERE rowid BETWEEN ? AND ? ORDER BY rowid", (lo, hi))
+
+        total = 0
+        for copied in copy_batches(cursor_sqlite, engine_postgres, name=f"worker {worker_id}"):
+            total += copied
+            print(f"[worker {worker_id}] {total}/{expected} rows (rowid {lo}..{hi})", flush=True)
+        return total
+    finally:
+        conn_sqlite.close()
+        engine_postgres.dispose()
+
+
+def migrate_parallel(workers: int = 4) -> int:
+    """Split the SQLite3 source into rowid ranges and COPY them from a pool of worker processes"""
+    conn_sqlite = sqlite3.connect(sqlite_db_file)
+    try:
+        ranges = rowid_ranges(conn_sqlite, workers)
+    finally:
+        conn_sqlite.close()
+
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(migrate_rowid_range, worker_id, lo, hi, batch_size, adaptive_batching)
+            for worker_id, (lo, hi) in enumerate(ranges, start=1)
+        ]
+        for future in as_completed(futures):
+            total += future.result()
+    return total
+
+
+def copy_table_security(cursor_postgres) -> None:
+    """Re-create my_asset's grants, row level security flags and policies on the staging table"""
+    statements = []
+    for query in (staged_grants_query, staged_policies_query):
+        cursor_postgres.execute(query, {'staging': staging_table})
+        statements.extend(statement for (statement,) in cursor_postgres.fetchall())
+    cursor_postgres.execute(staged_rls_query)
+    row_security, force_row_security = cursor_postgres.fetchone()
+    if row_security:
+        statements.append(f"ALTER TABLE {staging_table} ENABLE ROW LEVEL SECURITY")
+    if force_row_security:
+        statements.append(f"ALTER TABLE {staging_table} FORCE ROW LEVEL SECURITY")
+    for statement in statements:
+        cursor_postgres.execute(statement)
+
+
+def drop_staging_table(engine_postgres) -> None:
+    """Remove a leftover staging table (after a failed staged load)"""
+    raw_conn = engine_postgres.raw_connection()
+    try:
+        cursor_postgres = raw_conn.cursor()
+        cursor_postgres.execute(f"DROP TABLE IF EXISTS {staging_table}")
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+
+def migrate_staged(cursor_sqlite, engine_postgres) -> int:
+    """
+    Full reload: COPY into an UNLOGGED, index-free staging table, then swap it in
+
+    Indexes are built once after the load, the table is switched to LOGGED so it
+    survives a crash, and the rename swap runs in a single transaction, so readers
+    see either the old my_asset or the fully loaded one. Grants, row level security
+    and policies of the old table are re-created on the new one before the swap
+    (Supabase relies on them); the swap aborts (and the old table stays in place) if
+    other objects such as views depend on my_asset. If my_asset does not exist yet the
+    staging table simply becomes it. On any error the staging table is dropped.
+    """
+    drop_staging_table(engine_postgres)
+    raw_conn = engine_postgres.raw_connection()
+    try:
+        cursor_postgres = raw_conn.cursor()
+        cursor_postgres.execute(staging_ddl)
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+    try:
+        total = 0
+        for copied in copy_batches(cursor_sqlite, engine_postgres, staging_copy_query, name="staged"):
+            total += copied
+            print('.', end="", flush=True)
+
+        raw_conn = engine_postgres.raw_connection()
+        try:
+            cursor_postgres = raw_conn.cursor()
+            # 적재 완료 후 인덱스 1회 생성
+            print("\nBuilding indexes on staging table...")
+            cursor_postgres.execute(f"ALTER TABLE {staging_table} SET LOGGED")
+            cursor_postgres.execute(f"ALTER TABLE {staging_table} ADD CONSTRAINT {staging_table}_pkey PRIMARY KEY (seq)")
+            cursor_postgres.execute(f"ALTER TABLE {staging_table} ADD CONSTRAINT {staging_table}_seq_key UNIQUE (seq)")
+            cursor_postgres.execute(f"ANALYZE {staging_table}")
+            raw_conn.commit()
+
+            # 단일 트랜잭션으로 테이블 교체 (최초 적재면 이름만 변경)
+            print("Swapping staging table into my_asset...")
+            cursor_postgres.execute("SELECT to_regclass('my_asset') IS NOT NULL")
+            replacing = cursor_postgres.fetchone()[0]
+            if replacing:
+                cursor_postgres.execute("LOCK TABLE my_asset IN ACCESS EXCLUSIVE MODE")
+                copy_table_security(cursor_postgres)
+                cursor_postgres.execute("ALTER TABLE my_asset RENAME TO my_asset_old")
+            cursor_postgres.execute(f"ALTER TABLE {staging_table} RENAME TO my_asset")
+            if replacing:
+                cursor_postgres.execute("DROP TABLE my_asset_old")
+            cursor_postgres.execute(f"ALTER TABLE my_asset RENAME CONSTRAINT {staging_table}_pkey TO my_asset_pkey")
+            cursor_postgres.execute(f"ALTER TABLE my_asset RENAME CONSTRAINT {staging_table}_seq_key TO my_asset_seq_key")
+            raw_conn.commit()
+            cursor_postgres.close()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+    except Exception:
+        drop_staging_table(engine_postgres)
+        raise
+    return total
+
+
+def checkpoint_source() -> str:
+    """Checkpoint key identifying the SQLite3 source table"""
+    return f"{os.path.basename(sqlite_db_file)}:my_asset"
+
+
+def sync_incremental(engine_postgres) -> int:
+    """
+    Copy only the rows added since the last run, resuming from the stored rowid high-water mark
+
+    Each batch is COPYed and the checkpoint advanced in the same transaction, so a crash
+    leaves the target and the checkpoint consistent and the next run picks up where it stopped.
+    Assumes my_asset is append-only on the SQLite3 side (updated or deleted rows are not synced).
+    """
+    source = checkpoint_source()
+    raw_conn = engine_postgres.raw_connection()
+    conn_sqlite = sqlite3.connect(sqlite_db_file)
+    try:
+        cursor_postgres = raw_conn.cursor()
+        cursor_postgres.execute(checkpoint_ddl)
+        cursor_postgres.execute(checkpoint_select, (source,))
+        checkpoint = cursor_postgres.fetchone()
+        raw_conn.commit()
+        last_rowid = checkpoint[0] if checkpoint else 0
+        print(f"Resuming {source} after rowid {last_rowid}")
+
+        cursor_sqlite = conn_sqlite.cursor()
+        cursor_sqlite.execute(
+            "SELECT rowid, * FROM my_asset WHERE rowid > ? ORDER BY rowid", (last_rowid,)
+        )
+
+        total = 0
+        batcher = make_batcher("sync")
+        while True:
+            start_time = time.perf_counter()
+            batch = cursor_sqlite.fetchmany(batcher.size)
+            if not batch:
+                break
+            copy_from_buffer(cursor_postgres, copy_query, rows_to_copy_buffer([row[1:] for row in batch]))
+            cursor_postgres.execute(checkpoint_upsert, (source, batch[-1][0]))
+            raw_conn.commit()
+            batcher.record(batch, time.perf_counter() - start_time)
+            total += len(batch)
+            print('.', end="", flush=True)
+        cursor_postgres.close()
+        if adaptive_batching:
+            print(batcher.summary())
+        return total
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        conn_sqlite.close()
+        raw_conn.close()
+
+
+# 검증용 정규화 행 표현 [TARGET]
+# SQLite3 쪽 canonical_row() 와 같은 문자열을 만든다 (real -> float8 텍스트, timestamp -> UTC 마이크로초)
+HASH_MODULUS = 2 ** 61
+verify_row_text = r"""
+    concat_ws('|',
+        coalesce(index::text, '\N'),
+        coalesce(div, '\N'),
+        coalesce(asset, '\N'),
+        coalesce(qty::float8::text, '\N'),
+        coalesce(unit_usd::float8::text, '\N'),
+        coalesce(unit_krw::float8::text, '\N'),
+        coalesce(total_krw::float8::text, '\N'),
+        coalesce(asset_note, '\N'),
+        coalesce(to_char(timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.US'), '\N'))
+"""
+# SQLite3 쪽 timestamp -> epoch 초 (julianday 가 해석하지 못하면 NULL) [SOURCE]
+verify_sqlite_epoch = "(julianday(timestamp) - 2440587.5) * 86400.0"
+verify_chunk_expr = """
+    CASE WHEN timestamp IS NULL THEN -1
+         ELSE least(greatest(floor((extract(epoch FROM timestamp)::float8 - %(lo)s) / %(width)s), 0), %(chunks)s - 1)::int
+    END
+"""
+
+
+# real 컬럼은 float4: float8 값을 float4 로 반올림해서 비교
+_FLOAT32 = struct.Struct('f')
+
+
+def _canonical_float(value) -> str:
+    """Render a value the way PostgreSQL prints real::float8 (shortest round-trip digits); None stays None"""
+    if value is None:
+        return None
+    f = _FLOAT32.unpack(_FLOAT32.pack(float(value)))[0]
+    if 1e15 <= abs(f) < 1e16:
+        digits = repr(f)[:-2].lstrip('-').rstrip('0')
+        mantissa = digits[0] + ('.' + digits[1:] if len(digits) > 1 else '')
+        return ('-' if f < 0 else '') + mantissa + 'e+15'
+    r = repr(f)
+    return r[:-2] if r.endswith('.0') else r
+
+
+def _parse_timestamp(value):
+    """Parse a SQLite3 timestamp; naive values are taken as UTC, the time zone of the target sessions (get_target_engine)"""
+    if value is None:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+@functools.lru_cache(maxsize=4096)
+def _canonical_timestamp(value):
+    """(UTC epoch or None, canonical text) of a SQLite3 timestamp; cached, as every row of a snapshot shares it"""
+    if value is None:
+        return None, None
+    ts = _parse_timestamp(value)
+    if ts is None:
+        return None, str(value)
+    return ts.timestamp(), ts.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def canonical_row(row) -> str:
+    """Canonical text of a SQLite3 my_asset row, identical to verify_row_text on PostgreSQL"""
+    index, div, asset, qty, unit_usd, unit_krw, total_krw, asset_note, timestamp = row[:len(MY_ASSET_COLUMNS)]
+    values = [
+        None if index is None else str(int(index)),
+        div, asset,
+        _canonical_float(qty), _canonical_float(unit_usd), _canonical_float(unit_krw), _canonical_float(total_krw),
+        asset_note,
+        _canonical_timestamp(timestamp)[1],
+    ]
+    return "|".join(["\\N" if v is None else str(v) for v in values])
+
+
+def row_hash(row_text: str) -> int:
+    """60-bit hash of a canonical row (same bits as PostgreSQL's md5-based expression)"""
+    return int(hashlib.md5(row_text.encode()).hexdigest()[:15], 16)
+
+
+def _chunk_of(timestamp, lo: float, width: float, chunks: int) -> int:
+    """Chunk id of a SQLite3 timestamp, computed exactly like verify_chunk_expr"""
+    epoch = _canonical_timestamp(timestamp)[0]
+    if epoch is None:
+        return -1
+    # floor(a / b) like PostgreSQL, not a // b (1.0 // 0.1 == 9.0)
+    chunk = math.floor((epoch - lo) / width)
+    return min(max(chunk, 0), chunks - 1)
+
+
+def sqlite_chunk_summary(lo: float, width: float, chunks: int, rowid_lo: int, rowid_hi: int) -> dict:
+    """Worker: {chunk: (row count, hash sum)} over the SQLite3 rows with rowid in [rowid_lo, rowid_hi]"""
+    summary = {}
+    conn_sqlite = sqlite3.connect(sqlite_db_file)
+    try:
+        for row in conn_sqlite.execute(f"{select_query} WHERE rowid BETWEEN ? AND ?", (rowid_lo, rowid_hi)):
+            chunk = _chunk_of(row[8], lo, width, chunks)
+            count, total = summary.get(chunk, (0, 0))
+            summary[chunk] = (count + 1, (total + row_hash(canonical_row(row))) % HASH_MODULUS)
+    finally:
+        conn_sqlite.close()
+    return summary
+
+
+def merge_chunk_summaries(summaries) -> dict:
+    """Add up per-range {chunk: (row count, hash sum)} summaries"""
+    merged = {}
+    for summary in summaries:
+        for chunk, (count, total) in summary.items():
+            prev_count, prev_total = merged.get(chunk, (0, 0))
+            merged[chunk] = (prev_count + count, (prev_total + total) % HASH_MODULUS)
+    return merged
+
+
+def postgres_chunk_summary(engine_postgres, lo: float, width: float, chunks: int,
+                           range_lo=None, range_hi=None) -> dict:
+    """{chunk: (row count, hash sum)} over my_asset rows with timestamp in [range_lo, range_hi), hashed on the server"""
+    conditions = []
+    if range_lo is not None:
+        conditions.append("timestamp >= to_timestamp(%(range_lo)s)")
+    if range_hi is not None:
+        conditions.append("(timestamp < to_timestamp(%(range_hi)s) OR timestamp IS NULL)" if range_lo is None
+                          else "timestamp < to_timestamp(%(range_hi)s)")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT chunk, count(*), mod(sum(('x' || substr(md5(row_text), 1, 15))::bit(60)::bigint), {HASH_MODULUS})
+        FROM (SELECT {verify_chunk_expr} AS chunk, {verify_row_text} AS row_text FROM my_asset {where}) AS t
+        GROUP BY chunk
+    """
+    params = {'lo': lo, 'width': width, 'chunks': chunks, 'range_lo': range_lo, 'range_hi': range_hi}
+    raw_conn = engine_postgres.raw_connection()
+    try:
+        cursor_postgres = raw_conn.cursor()
+        cursor_postgres.execute("SET extra_float_digits = 1")
+        cursor_postgres.execute(query, params)
+        return {chunk: (count, int(total)) for chunk, count, total in cursor_postgres.fetchall()}
+    finally:
+        raw_conn.close()
+
+
+def _chunk_range(chunk: int, lo: float, width: float, chunks: int):
+    """
+    Epoch range [range_lo, range_hi) that contains a chunk, padded by a second so float
+    rounding cannot drop boundary rows (the exact chunk is checked afterwards); the first
+    and last chunk are open-ended because out-of-range timestamps are clamped into them
+    """
+    range_lo = None if chunk <= 0 else lo + chunk * width - 1
+    range_hi = None if chunk >= chunks - 1 else lo + (chunk + 1) * width + 1
+    return range_lo, range_hi
+
+
+def diff_chunk(engine_postgres, chunk: int, lo: float, width: float, chunks: int) -> dict:
+    """Drill into one mismatching chunk and return the rows missing from / extra in PostgreSQL"""
+    range_lo, range_hi = _chunk_range(chunk, lo, width, chunks)
+
+    # SQLite3: rows whose timestamp falls in the range, plus those SQLite cannot parse
+    # (NULL and odd formats; _chunk_of decides where they belong)
+    epoch = verify_sqlite_epoch
+    conditions = ["julianday(timestamp) IS NULL"]
+    if chunk != -1:
+        in_range = [f"{epoch} >= :range_lo" if range_lo is not None else "1",
+                    f"{epoch} < :range_hi" if range_hi is not None else "1"]
+        conditions.append(f"({' AND '.join(in_range)})")
+    conn_sqlite = sqlite3.connect(sqlite_db_file)
+    try:
+        source = Counter(
+            canonical_row(row) for row in conn_sqlite.execute(
+                f"{select_query} WHERE {' OR '.join(conditions)}", {'range_lo': range_lo, 'range_hi': range_hi})
+            if _chunk_of(row[8], lo, width, chunks) == chunk
+        )
+    finally:
+        conn_sqlite.close()
+
+    if chunk == -1:
+        where = "timestamp IS NULL"
+    else:
+        where = " AND ".join(["timestamp IS NOT NULL"]
+                             + (["timestamp >= to_timestamp(%(range_lo)s)"] if range_lo is not None else [])
+                             + (["timestamp < to_timestamp(%(range_hi)s)"] if range_hi is not None else []))
+    raw_conn = engine_postgres.raw_connection()
+    try:
+        cursor_postgres = raw_conn.cursor()
+        cursor_postgres.execute("SET extra_float_digits = 1")
+        cursor_postgres.execute(
+            f"SELECT row_text FROM (SELECT {verify_chunk_expr} AS chunk, {verify_row_text} AS row_text "
+            f"FROM my_asset WHERE {where}) AS t WHERE chunk = %(chunk)s",
+            {'lo': lo, 'width': width, 'chunks': chunks, 'chunk': chunk, 'range_lo': range_lo, 'range_hi': range_hi},
+        )
+        target = Counter(row_text for (row_text,) in cursor_postgres.fetchall())
+    finally:
+        raw_conn.close()
+
+    return {
+        'chunk': chunk,
+        'missing': list((source - target).elements()),
+        'extra': list((target - source).elements()),
+    }
+
+
+def verify_migration(chunks: int = 64, workers: int = 4, sample: int = 5) -> bool:
+    """
+    Compare SQLite3 my_asset with PostgreSQL my_asset chunk by chunk
+
+    Both sides are split into `chunks` timestamp ranges and reduced to (row count, hash sum)
+    per chunk. PostgreSQL computes its hashes server-side over `workers` parallel range
+    scans; SQLite3 rows are hashed by a pool of `workers` processes over rowid ranges, like
+    --mode parallel. Only chunks whose summaries differ are compared row by row.
+    """
+    conn_sqlite = sqlite3.connect(sqlite_db_file)
+    try:
+        # chunk 경계는 양쪽이 같은 lo/width 를 쓰기만 하면 되므로 SQLite 에서 바로 계산
+        lo, hi = conn_sqlite.execute(f"SELECT min({verify_sqlite_epoch}), max({verify_sqlite_epoch}) FROM my_asset").fetchone()
+        source_ranges = rowid_ranges(conn_sqlite, workers)
+    finally:
+        conn_sqlite.close()
+    lo, hi = (lo, hi) if lo is not None else (0.0, 0.0)
+    width = (hi - lo) / chunks or 1.0
+
+    # PostgreSQL 는 workers 개의 timestamp 구간으로 나누어 병렬 집계
+    bounds = [lo + width * chunks * i / workers for i in range(1, workers)]
+    ranges = list(zip([None, *bounds], [*bounds, None]))
+
+    # SQLite3 worker 프로세스는 PostgreSQL 연결/스레드가 생기기 전에 시작
+    with ProcessPoolExecutor(max_workers=workers) as processes:
+        source_futures = [
+            processes.submit(sqlite_chunk_summary, lo, width, chunks, rowid_lo, rowid_hi)
+            for rowid_lo, rowid_hi in source_ranges
+        ]
+        engine_postgres = get_target_engine(pool_size=workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                target_futures = [
+                    executor.submit(postgres_chunk_summary, engine_postgres, lo, width, chunks, range_lo, range_hi)
+                    for range_lo, range_hi in ranges
+                ]
+                source = merge_chunk_summaries(future.result() for future in source_futures)
+                target = merge_chunk_summaries(future.result() for future in target_futures)
+
+                mismatched = sorted(c for c in set(source) | set(target) if source.get(c) != target.get(c))
+                print(f"Source rows: {sum(c for c, _ in source.values())}, "
+                      f"target rows: {sum(c for c, _ in target.values())}, "
+                      f"chunks: {len(set(source) | set(target))}, mismatched: {len(mismatched)}")
+
+                diffs = executor.map(lambda c: diff_chunk(engine_postgres, c, lo, width, chunks), mismatched)
+                for diff in diffs:
+                    print(f"Chunk {diff['chunk']}: {len(diff['missing'])} missing, {len(diff['extra'])} extra")
+                    for row_text in diff['missing'][:sample]:
+                        print(f"  - missing: {row_text}")
+                    for row_text in diff['extra'][:sample]:
+                        print(f"  + extra:   {row_text}")
+        finally:
+            engine_postgres.dispose()
+    return not mismatched
+
+
+MIGRATION_MODES = {
+    "row": migrate_row_by_row,
+    "copy": migrate_copy,
+    "values": migrate_values,
+    "staged": migrate_staged,
+}
+
+
+def run_migration(mode: str = "copy", workers: int = 4) -> dict:
+    """Run the SQLite3 -> PostgreSQL migration and report throughput"""
+    start_time = time.perf_counter()
+    if mode == "parallel":
+        rows = migrate_parallel(workers)
+    elif mode == "sync":
+        engine_postgres = get_target_engine()
+        try:
+            rows = sync_incremental(engine_postgres)
+        finally:
+            engine_postgres.dispose()
+    else:
+        # SQLite3 DB 연결 [SOURCE]
+        conn_sqlite = sqlite3.connect(sqlite_db_file)
+        cursor_sqlite = conn_sqlite.cursor()
+        cursor_sqlite.execute(select_query)
+
+        engine_postgres = get_target_engine()
+        try:
+            rows = MIGRATION_MODES[mode](cursor_sqlite, engine_postgres)
+        finally:
+            # 연결 종료
+            conn_sqlite.close()
+            engine_postgres.dispose()
+    elapsed = time.perf_counter() - start_time
+
+    result = {
+        'mode': mode,
+        'rows': rows,
+        'execution_time': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0,
+    }
+    print(f"\n[{mode}] {rows} rows in {elapsed:.2f} seconds ({result['rows_per_second']:.0f} rows/sec)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate my_asset from SQLite3 to PostgreSQL")
+    parser.add_argument("--mode", choices=sorted([*MIGRATION_MODES, "parallel", "sync", "verify"]), default="copy",
+                        help="row: insert+commit per row, copy: COPY per batch, values: multi-row VALUES per batch, "
+                             "parallel: COPY rowid ranges from several worker processes, "
+                             "sync: resumable incremental copy of rows added since the last sync, "
+                             "staged: full reload via an UNLOGGED staging table and atomic swap, "
+                             "verify: compare source and target with per-chunk checksums")
+    parser.add_argument("--batch-size", type=int, default=batch_size,
+                        help="rows per batch (initial size when --adaptive is set)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="tune the batch size for the best rows/sec within a memory ceiling")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="number of worker processes for --mode parallel, parallel range scans on each side for --mode verify")
+    parser.add_argument("--chunks", type=int, default=64,
+                        help="number of timestamp chunks compared by --mode verify")
+    args = parser.parse_args()
 
-# 연결 종료
-conn_sqlite.close()
+    batch_size = args.batch_size
+    adaptive_batching = args.adaptive
+    if args.mode == "verify":
+        raise SystemExit(0 if verify_migration(args.chunks, workers=args.workers) else 1)
+    run_migration(args.mode, workers=args.workers)
@@ -0,0 +1,134 @@
+import re
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.engine.result import result_tuple
+from result_cache import ResultCache
+from row_formats import format_rows
+
+# Total count strategies for paginate_query
+COUNT_STRATEGIES = ('exact', 'estimate', 'cached', 'window')
+
+# Column carrying COUNT(*) OVER() for count_strategy='window'
+WINDOW_TOTAL_COLUMN = '_pagination_total'
+
+# Cached exact counts: (count query text, params) -> total, LRU-bounded with per-entry TTL
+# (a cached total is sized at ~28 bytes, so this keeps roughly 4,000 of them)
+_count_cache = ResultCache(max_bytes=128 * 1024)
+
+# Comments, quoted strings/identifiers, parentheses and ORDER BY, for _split_order_by
+_ORDER_BY_TOKENS = re.compile(
+    r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\(|\)|\border\s+by\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+@dataclass
+class PaginationResult:
+    """Pagination result container"""
+    items: List[Any]
+    total: int
+    page: int
+    per_page: int
+    total_pages: int
+    total_is_exact: bool = True
+
+
+def query_key(query: str) -> str:
+    """
+    Cache key text for a query: the SQL as written, minus surrounding whitespace and a trailing semicolon
+
+    Whitespace is not collapsed: inside string literals, quoted identifiers and comments it
+    is significant, and queries that differ there must not share a cached result.
+    """
+    return query.strip().rstrip(';').rstrip()
+
+
+def params_key(params: Optional[Dict]) -> str:
+    """Stable string key for query parameters"""
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+
+def count_key(count_query: str, params: Optional[Dict] = None) -> Tuple[str, str]:
+    """Count cache key: the count query text and its parameters"""
+    return query_key(count_query), params_key(params)
+
+
+def cached_total(key: Tuple[str, str]) -> Optional[int]:
+    """Cached total for a count_key, or None if it is missing or expired"""
+    # Expired entries are dropped on read, the least recently used ones once the cache is full
+    hit, total = _count_cache.get(key)
+    return total if hit else None
+
+
+def store_total(key: Tuple[str, str], total: int, ttl: float) -> None:
+    """Cache a total for `ttl` seconds"""
+    _count_cache.put(key, total, ttl=ttl)
+
+
+def clear_count_cache() -> None:
+    """Forget every cached paginate_query total"""
+    _count_cache.clear()
+
+
+def _split_order_by(query: str) -> Tuple[str, Optional[str]]:
+    """Split a trailing top-level ORDER BY off a query: (query without it, sort keys or None)"""
+    query = query_key(query)
+    depth, start = 0, None
+    for match in _ORDER_BY_TOKENS.finditer(query):
+        token = match.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token[0] in 'oO':
+            start = match
+    if start is None:
+        return query, None
+    return query[:start.start()].rstrip(), query[start.end():].strip()
+
+
+def offset_page_query(query: str, limit: int, offset: int) -> str:
+    """Base query with LIMIT/OFFSET appended on a new line (a trailing -- comment cannot swallow them)"""
+    return f"{query_key(query)}\nLIMIT {limit} OFFSET {offset}"
+
+
+def default_count_query(query: str) -> str:
+    """COUNT(*) over the base query, for paginate_query without a count_query"""
+    return f"SELECT COUNT(*) AS count FROM (\n{query_key(query)}\n) AS subquery"
+
+
+def window_page_query(query: str, limit: int, offset: int) -> str:
+    """
+    Page query for count_strategy='window': the page plus a COUNT(*) OVER() total column
+
+    The base query's ORDER BY is moved to the outer query, because the order of a
+    subquery is not guaranteed to survive the outer SELECT; its sort keys must
+    therefore be output column names. The base query is otherwise kept as written, on
+    its own lines, so a -- comment in it cannot swallow the wrapper. The window needs
+    every row of the result, so each page costs a read (and sort) of the whole result,
+    O(total) rather than O(offset + limit).
+    """
+    query, order_by = _split_order_by(query)
+    order_clause = f"\nORDER BY {order_by}" if order_by else ""
+    return (
+        f"SELECT *, COUNT(*) OVER() AS {WINDOW_TOTAL_COLUMN} FROM (\n{query}\n) AS subquery"
+        f"{order_clause}\nLIMIT {limit} OFFSET {offset}"
+    )
+
+
+def split_window_rows(rows: Sequence, row_format: str) -> Tuple[List, Optional[int]]:
+    """
+    Drop the WINDOW_TOTAL_COLUMN from window_page_query rows (fetched as 'row')
+
+    Returns:
+        (items in `row_format`, total or None when the page is empty)
+    """
+    if not rows:
+        return [], None
+    columns = list(rows[0]._fields[:-1])
+    values = [row[:-1] for row in rows]
+    if row_format == 'row':
+        make_row = result_tuple(columns)
+        return [make_row(row) for row in values], rows[0][-1]
+    return format_rows(columns, values, row_format), rows[0][-1]
@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from sqlalchemy.engine import Engine
+from db import get_engine, cached_text
+from row_formats import check_row_format, format_rows
+
+# A statement for execute_pipeline(): SQL or (SQL, params)
+Statement = Union[str, Tuple[str, Optional[Dict]]]
+
+
+def pipeline_supported() -> bool:
+    """True when psycopg 3 is installed and its libpq supports pipeline mode"""
+    try:
+        import psycopg
+    except ImportError:
+        return False
+    return psycopg.Pipeline.is_supported()
+
+
+def get_pipeline_engine(engine: Optional[Engine] = None) -> Engine:
+    """
+    Engine whose connections can pipeline: the given one if it already uses psycopg 3,
+    otherwise a shared psycopg 3 engine for the same database (same DB_* pool settings)
+    """
+    engine = engine or get_engine()
+    if engine.dialect.name != 'postgresql' or engine.dialect.driver == 'psycopg' or not pipeline_supported():
+        return engine
+    url = engine.url.set(drivername='postgresql+psycopg')
+    return get_engine(url.render_as_string(hide_password=False))
+
+
+def _split(statement: Statement) -> Tuple[str, Dict]:
+    if isinstance(statement, str):
+        return statement, {}
+    return statement[0], statement[1] or {}
+
+
+def execute_pipeline(
+    statements: Sequence[Statement],
+    row_format: str = 'dict',
+    engine: Optional[Engine] = None,
+) -> List[List[Any]]:
+    """
+    Run independent statements in one network round trip and return every result set
+
+    On PostgreSQL with psycopg 3, all statements are sent at once in libpq pipeline mode
+    and the results are read back afterwards, so N statements cost one round trip of
+    latency instead of N. Elsewhere they run one after another on a single connection.
+    Statements run in one transaction, which is committed at the end; if one fails the
+    rest are skipped and the error is raised.
+
+    Args:
+        statements: SQL strings or (SQL, params) tuples with :named parameters
+        row_format: 'dict', 'tuple' or 'record' ('row' returns driver tuples when pipelined)
+        engine: Engine to use (default: the shared engine)
+
+    Returns:
+        One list of rows per statement, in order (empty for statements returning no rows)
+    """
+    check_row_format(row_format)
+    engine = get_pipeline_engine(engine)
+    if engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg' and pipeline_supported():
+        return _execute_pipelined(engine, [_split(s) for s in statements], row_format)
+
+    results = []
+    with engine.connect() as conn:
+        for query, params in map(_split, statements):
+            result = conn.execute(cached_text(query), params)
+            results.append(format_rows(list(result.keys()), result.fetchall(), row_format) if result.returns_rows else [])
+        conn.commit()
+    return results
+
+
+def _execute_pipelined(engine: Engine, statements: List[Tuple[str, Dict]], row_format: str) -> List[List[Any]]:
+    # :named -> %(named)s with SQLAlchemy's own compiler, as for a regular execute
+    compiled = []
+    for query, params in statements:
+        clause = cached_text(query).compile(dialect=engine.dialect)
+        compiled.append((str(clause), clause.construct_params(params)))
+
+    raw_conn = engine.raw_connection()
+    try:
+        pg_conn = raw_conn.driver_connection
+        cursors = []
+        with pg_conn.pipeline():
+            for query, params in compiled:
+                cursor = pg_conn.cursor()
+                cursor.execute(query, params)
+                cursors.append(cursor)
+        # Leaving the pipeline block has synced and received every result
+
+        results = []
+        for cursor in cursors:
+            if cursor.description is None:
+                results.append([])
+            else:
+                columns = [column.name for column in cursor.description]
+                results.append(format_rows(columns, cursor.fetchall(), row_format))
+            cursor.close()
+        raw_conn.commit()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+    return results
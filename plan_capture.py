@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from rich import print
+from db import cached_text
+from instrumentation import fingerprint, query_id
+
+logger = logging.getLogger(__name__)
+
+PLAN_STORE_PATH = os.getenv('PLAN_STORE_PATH', 'query_plans.db')
+
+# Node types that read a relation through an index
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan')
+
+# A new plan this many times slower (or costlier) than the last one is flagged,
+# unless it still runs in under MIN_FLAGGED_MS (timings of tiny queries are noise)
+SLOWDOWN_FACTOR = 2.0
+MIN_FLAGGED_MS = 1.0
+
+
+def plan_nodes(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every node of an EXPLAIN (FORMAT JSON) plan tree, depth first"""
+    nodes = [plan]
+    for child in plan.get('Plans', []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def summarize_plan(explain: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Condense EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output into the parts compared between captures
+
+    Returns:
+        {'access': {relation: [node types]}, 'sorts': [sort keys], 'total_cost',
+         'execution_ms', 'planning_ms', 'shared_hit', 'shared_read'}
+    """
+    top = explain[0]
+    root = top['Plan']
+    access: Dict[str, List[str]] = {}
+    sorts = []
+    for node in plan_nodes(root):
+        relation = node.get('Relation Name')
+        if relation:
+            access.setdefault(relation, []).append(node['Node Type'])
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            sorts.append(', '.join(node.get('Sort Key', [])))
+    return {
+        'access': access,
+        'sorts': sorts,
+        'total_cost': root.get('Total Cost'),
+        'execution_ms': top.get('Execution Time'),
+        'planning_ms': top.get('Planning Time'),
+        'shared_hit': root.get('Shared Hit Blocks'),
+        'shared_read': root.get('Shared Read Blocks'),
+    }
+
+
+def compare_plans(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    Regressions of `current` against `previous` (both from summarize_plan)
+
+    Flags a sequential scan replacing an index scan on the same relation, a sort that
+    was not needed before (an index no longer provides the order), and a large jump in
+    execution time or estimated cost.
+    """
+    regressions = []
+    for relation, node_types in current['access'].items():
+        before = previous['access'].get(relation, [])
+        if 'Seq Scan' in node_types and 'Seq Scan' not in before:
+            replaced = next((t for t in before if t in INDEX_SCANS), None)
+            if replaced:
+                regressions.append(f"Seq Scan on {relation} replaced {replaced}")
+    for sort_key in current['sorts']:
+        if sort_key not in previous['sorts']:
+            regressions.append(f"New Sort on {sort_key}")
+    for key, label in (('execution_ms', 'execution time'), ('total_cost', 'estimated cost')):
+        old, new = previous.get(key), current.get(key)
+        if key == 'execution_ms' and (new or 0) < MIN_FLAGGED_MS:
+            continue
+        if old and new and new > old * SLOWDOWN_FACTOR:
+            regressions.append(f"{label} {old:,.2f} -> {new:,.2f}")
+    return regressions
+
+
+class PlanStore:
+    """SQLite file holding every captured plan per statement fingerprint"""
+
+    def __init__(self, path: str = PLAN_STORE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plans (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    query_id TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    captured_at TEXT NOT NULL,
+                    execution_ms REAL,
+                    total_cost REAL,
+                    summary TEXT NOT NULL,
+                    plan TEXT NOT NULL,
+                    regressions TEXT NOT NULL,
+                    statement TEXT,
+                    params TEXT
+                )
+            """)
+            # Stores created before statement/params were kept
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(plans)")}
+            for column in ('statement', 'params'):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE plans ADD COLUMN {column} TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_query_id ON plans (query_id, id)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def latest(self, qid: str) -> Optional[Dict[str, Any]]:
+        """Most recent capture for a query id"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM plans WHERE query_id = ? ORDER BY id DESC LIMIT 1", (qid,)).fetchone()
+        return self._decode(row) if row else None
+
+    def add(self, fingerprint_text: str, explain: List[Dict[str, Any]], statement: Optional[str] = None,
+            params: Optional[Dict] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Store a capture, comparing it with the previous one
+
+        Args:
+            fingerprint_text: Normalized statement
+            explain: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output
+            statement: The SQL as executed, kept so the workload can be replayed (index-advisor.py)
+            params: Its parameters
+
+        Returns:
+            (summary, regressions)
+        """
+        qid = query_id(fingerprint_text)
+        summary = summarize_plan(explain)
+        previous = self.latest(qid)
+        regressions = compare_plans(previous['summary'], summary) if previous else []
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO plans (query_id, fingerprint, captured_at, execution_ms, total_cost, summary, plan, "
+                "regressions, statement, params) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (qid, fingerprint_text, datetime.now(timezone.utc).isoformat(), summary['execution_ms'],
+                 summary['total_cost'], json.dumps(summary), json.dumps(explain), json.dumps(regressions),
+                 statement, json.dumps(params, default=str) if params is not None else None),
+            )
+        return summary, regressions
+
+    def history(self, qid: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Captures of one query id, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM plans WHERE query_id = ? ORDER BY id DESC LIMIT ?", (qid, limit)).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def latest_all(self) -> List[Dict[str, Any]]:
+        """Most recent capture of every query id"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM plans WHERE id IN (SELECT MAX(id) FROM plans GROUP BY query_id) ORDER BY execution_ms DESC"
+            ).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def regressions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent captures that were flagged"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM plans WHERE regressions != '[]' ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._decode(row) for row in rows]
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for key in ('summary', 'plan', 'regressions', 'params'):
+            if record.get(key) is not None:
+                record[key] = json.loads(record[key])
+        return record
+
+
+class PlanCapture:
+    """
+    Sampled EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) capture for executed statements
+
+    A fingerprint is captured the first time it is seen, then for a `sample_rate`
+    fraction of its executions but at most once per `min_interval` seconds. Plans are
+    captured on a background thread (EXPLAIN ANALYZE runs the query again, inside a
+    transaction that is rolled back) and stored in a PlanStore; regressions against the
+    previous capture are logged as warnings. Only SELECT/WITH statements on PostgreSQL
+    are captured.
+    """
+
+    def __init__(self, engine: Engine, store: Optional[PlanStore] = None,
+                 sample_rate: float = 0.01, min_interval: float = 300.0):
+        self.engine = engine
+        self.store = store or PlanStore()
+        self.sample_rate = sample_rate
+        self.min_interval = min_interval
+        self.captured = 0
+        self._last_capture: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='plan-capture')
+        self._pending = []
+
+    def should_capture(self, fingerprint_text: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_capture.get(fingerprint_text)
+            if last is not None and (now - last < self.min_interval or random.random() >= self.sample_rate):
+                return False
+            self._last_capture[fingerprint_text] = now
+            return True
+
+    def observe(self, query: str, params: Optional[Dict] = None) -> None:
+        """Called after a statement ran; schedules a capture when it is sampled"""
+        if self.engine.dialect.name != 'postgresql' or not query.lstrip().lower().startswith(('select', 'with')):
+            return
+        fingerprint_text = fingerprint(query)
+        if self.should_capture(fingerprint_text):
+            future = self._executor.submit(self._capture, fingerprint_text, query, dict(params or {}))
+            with self._lock:
+                self._pending = [pending for pending in self._pending if not pending.done()]
+                self._pending.append(future)
+
+    def _capture(self, fingerprint_text: str, query: str, params: Dict) -> None:
+        try:
+            with self.engine.connect() as conn:
+                explain = conn.execute(cached_text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params).scalar()
+                conn.rollback()
+            if isinstance(explain, str):
+                explain = json.loads(explain)
+            summary, regressions = self.store.add(fingerprint_text, explain, query, params)
+            with self._lock:
+                self.captured += 1
+            if regressions:
+                logger.warning("Plan regression for %s: %s", fingerprint_text[:200], '; '.join(regressions))
+        except Exception:
+            logger.exception("Plan capture failed for %s", fingerprint_text[:200])
+
+    def flush(self) -> None:
+        """Wait for scheduled captures to finish"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown()
+
+
+def print_plans(store: PlanStore, regressions_only: bool = False) -> None:
+    """Print the latest capture per statement (or the flagged captures)"""
+    records = store.regressions() if regressions_only else store.latest_all()
+    if not records:
+        print("No plans captured." if not regressions_only else "No regressions flagged.")
+        return
+    for record in records:
+        summary = record['summary']
+        access = ', '.join(f"{relation}: {'/'.join(types)}" for relation, types in summary['access'].items())
+        print(f"\n[{record['query_id']}] {record['captured_at']}  "
+              f"{summary['execution_ms'] or 0:.2f} ms, cost {summary['total_cost'] or 0:,.0f}")
+        print(f"  {record['fingerprint'][:160]}")
+        print(f"  access: {access or '-'}" + (f"; sorts: {', '.join(summary['sorts'])}" if summary['sorts'] else ''))
+        for regression in record['regressions']:
+            print(f"  [red]REGRESSION[/red] {regression}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show captured query plans")
+    parser.add_argument('--store', default=PLAN_STORE_PATH, help="Plan store SQLite file")
+    parser.add_argument('--regressions', action='store_true', help="Only show captures flagged as regressions")
+    args = parser.parse_args()
+    print_plans(PlanStore(args.store), regressions_only=args.regressions)
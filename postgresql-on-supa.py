@@ -1,7 +1,9 @@
 import os
 import pprint
-from sqlalchemy import create_engine, text, MetaData
+from sqlalchemy import text, MetaData
 from dotenv import load_dotenv
+from db import get_engine
+from main import stream_rows
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,7 +15,7 @@ if not CONNECTION_STRING:
 
 def get_table_info():
     # Create an engine
-    engine = create_engine(CONNECTION_STRING)
+    engine = get_engine()
     conn = engine.connect()
     
     # 메타데이터 객체 생성 및 리플렉션
@@ -85,7 +87,7 @@ def get_table_info():
     get_object_schema("asset_total_history_report")
 
 def conn_db_and_exec_query(stmt):
-    engine = create_engine(CONNECTION_STRING)    
+    engine = get_engine()
     with engine.connect() as conn:
         result_set = conn.execute(text(stmt))
         return result_set
@@ -148,29 +150,21 @@ def use_case_02():
 
 
 def use_case_03():
-    engine = create_engine(CONNECTION_STRING) 
-    with engine.connect() as connection:
-        # Build the select query
-        select_query = """
-        SELECT * 
-        FROM asset_total_history_report 
-        ORDER BY "timestamp" DESC 
-        -- LIMIT 10
-        """
-        
-        # Execute the query
-        result_set = connection.execute(text(select_query))
-        
-        # Get column names from the result set
-        columns = result_set.keys()
-        
-        # Print the results with column names
-        for row in result_set:
-            # Create a dictionary of column name to value
-            row_dict = dict(zip(columns, row))
-            # Print the last two columns dynamically
-            last_two_columns = list(columns)[-2:]
-            print(", ".join(f"{col}: {row_dict[col]}" for col in last_two_columns))
+    # Build the select query
+    select_query = """
+    SELECT * 
+    FROM asset_total_history_report 
+    ORDER BY "timestamp" DESC 
+    -- LIMIT 10
+    """
+
+    # 서버 사이드 커서로 청크 단위 스트리밍 (전체 결과를 메모리에 올리지 않음)
+    last_two_columns = None
+    for row_dict in stream_rows(select_query, chunk_size=5000):
+        # Print the last two columns dynamically
+        if last_two_columns is None:
+            last_two_columns = list(row_dict)[-2:]
+        print(", ".join(f"{col}: {row_dict[col]}" for col in last_two_columns))
 
 if __name__ == "__main__":
     print("=-"*10,"start!")
@@ -0,0 +1,159 @@
+import re
+import sys
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+# FROM/JOIN targets: table, "table", schema.table, "schema"."table"
+_TABLE_PATTERN = re.compile(r'\b(?:from|join)\s+((?:"[^"]+"|\w+)(?:\s*\.\s*(?:"[^"]+"|\w+))?)', re.IGNORECASE)
+
+# Lists longer than this are sized from a sample instead of element by element
+_SIZE_SAMPLE = 100
+
+
+def normalize_table_name(name: str) -> str:
+    """'"public"."Asset_Master"' / 'public.asset_master' / 'asset_master' -> table name key"""
+    name = name.split('.')[-1].strip()
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1]
+    return name.lower()
+
+
+def tables_in_query(query: str) -> Set[str]:
+    """Best-effort set of tables a query reads (FROM and JOIN targets)"""
+    return {normalize_table_name(match) for match in _TABLE_PATTERN.findall(query)}
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached result in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)) and not isinstance(value, (str, bytes)):
+        if not value:
+            return size
+        if len(value) > _SIZE_SAMPLE:
+            step = len(value) // _SIZE_SAMPLE
+            sample = value[::step][:_SIZE_SAMPLE]
+            return size + sum(estimate_size(v) for v in sample) * len(value) // len(sample)
+        return size + sum(estimate_size(v) for v in value)
+    if hasattr(value, '_mapping'):  # SQLAlchemy Row
+        return size + sum(estimate_size(v) for v in value)
+    return size
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    tables: Set[str]
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU cache for query results with per-entry TTL and table invalidation
+
+    Entries are evicted least-recently-used first once the estimated size of all cached
+    results exceeds `max_bytes`, and expire `ttl` seconds after they were stored. Each
+    entry remembers the tables its query reads so writers can drop every result that
+    depends on a table with invalidate(table).
+
+    Cached results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (True, value) on a fresh hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry.value
+
+    def put(self, key: Hashable, value: Any, tables: Iterable[str] = (), ttl: Optional[float] = None) -> bool:
+        """
+        Store a result; returns False if it is larger than the whole cache
+
+        Args:
+            key: Cache key
+            value: Result to cache
+            tables: Tables the result depends on (for invalidate)
+            ttl: Seconds until the entry expires (default: the cache's ttl)
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return False
+        entry = _Entry(value, size, time.monotonic() + (self.ttl if ttl is None else ttl),
+                       {normalize_table_name(t) for t in tables})
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += size
+            for table in entry.tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, *tables: str) -> int:
+        """Drop every cached result that reads any of the given tables; returns the number dropped"""
+        removed = 0
+        with self._lock:
+            for table in tables:
+                for key in list(self._by_table.get(normalize_table_name(table), ())):
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Drop every cached result (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
@@ -0,0 +1,146 @@
+import gc
+import keyword
+import threading
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Row representations supported by the fetch_* helpers
+#   dict   - {column: value} per row (default, repeats every key)
+#   tuple  - plain tuple in column order
+#   row    - SQLAlchemy Row as returned by the driver (tuple-like, with ._mapping)
+#   record - instance of a generated tuple subclass with named fields and empty __slots__,
+#            one class per column list
+ROW_FORMATS = ('dict', 'tuple', 'row', 'record')
+
+# Above this many rows the cyclic GC is paused while rows are built
+GC_PAUSE_THRESHOLD = 10_000
+
+_record_classes: Dict[Tuple[str, ...], type] = {}
+_record_classes_lock = threading.Lock()
+
+
+class Record(tuple):
+    """Base class for generated record classes: a tuple with named, read-only fields"""
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    # Built straight from the driver row by tuple.__new__, with no Python-level __init__
+    _make = classmethod(tuple.__new__)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._fields.index(key))
+        return tuple.__getitem__(self, key)
+
+    def __repr__(self) -> str:
+        values = ', '.join(f"{field}={value!r}" for field, value in zip(self._fields, self))
+        return f"{type(self).__name__}({values})"
+
+    def _asdict(self) -> Dict[str, Any]:
+        return dict(zip(self._fields, self))
+
+
+def _attribute_names(columns: Sequence[str]) -> Tuple[str, ...]:
+    """Valid, unique attribute names for the columns ('count(*)' -> '_1', duplicates -> '_<i>')"""
+    attrs = []
+    for i, column in enumerate(columns):
+        if (not column.isidentifier() or keyword.iskeyword(column)
+                or column.startswith('_') or column in attrs):
+            column = f'_{i}'
+        attrs.append(column)
+    return tuple(attrs)
+
+
+def record_class(columns: Sequence[str]) -> type:
+    """
+    Return the record class for a result shape, creating it on first use
+
+    Classes have empty __slots__ (no per-instance __dict__) and are cached by column list,
+    so every query with the same columns shares one class and each row costs a single
+    tuple-sized object instead of a dict that repeats every key.
+    """
+    columns = tuple(columns)
+    cls = _record_classes.get(columns)
+    if cls is not None:
+        return cls
+
+    with _record_classes_lock:
+        cls = _record_classes.get(columns)
+        if cls is None:
+            namespace: Dict[str, Any] = {'__slots__': (), '_fields': columns}
+            for i, attr in enumerate(_attribute_names(columns)):
+                namespace[attr] = property(itemgetter(i), doc=f"Column {columns[i]!r}")
+            cls = type(f"Record{len(_record_classes)}", (Record,), namespace)
+            _record_classes[columns] = cls
+    return cls
+
+
+@contextmanager
+def _gc_paused(enabled: bool = True):
+    """
+    Pause the cyclic garbage collector around a bulk allocation
+
+    Building hundreds of thousands of container objects repeatedly triggers collections
+    that rescan everything allocated so far; the rows built here cannot form cycles.
+    """
+    was_enabled = gc.isenabled()
+    if enabled and was_enabled:
+        gc.disable()
+    try:
+        yield
+    finally:
+        if enabled and was_enabled:
+            gc.enable()
+
+
+def format_rows(columns: Sequence[str], rows: Sequence, row_format: str = 'dict') -> List:
+    """
+    Convert driver rows into the requested representation
+
+    Args:
+        columns: Column names of the result
+        rows: Rows as returned by the driver (SQLAlchemy Row objects)
+        row_format: One of ROW_FORMATS
+
+    Returns:
+        List of rows in the requested format
+    """
+    if row_format == 'row':
+        return list(rows)
+    with _gc_paused(len(rows) > GC_PAUSE_THRESHOLD):
+        if row_format == 'dict':
+            return [dict(zip(columns, row)) for row in rows]
+        if row_format == 'tuple':
+            return [tuple(row) for row in rows]
+        if row_format == 'record':
+            return list(map(record_class(columns)._make, rows))
+    raise ValueError(f"Unknown row format: {row_format}")
+
+
+def check_row_format(row_format: str) -> None:
+    """Raise ValueError for an unsupported row format"""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown row format: {row_format}")
+
+
+# row type -> converter to dict, resolved once per type
+_dict_converters: Dict[type, Callable[[Any], Dict]] = {}
+
+
+def _resolve_dict_converter(row_type: type) -> Callable[[Any], Dict]:
+    if issubclass(row_type, dict):
+        return dict
+    if hasattr(row_type, '_asdict'):  # SQLAlchemy Row, records, namedtuples
+        return lambda row: row._asdict()
+    if hasattr(row_type, '_mapping'):
+        return lambda row: dict(row._mapping)
+    return dict
+
+
+def to_dict(row) -> Dict:
+    """Convert any supported row representation to a dictionary"""
+    converter = _dict_converters.get(type(row))
+    if converter is None:
+        converter = _dict_converters[type(row)] = _resolve_dict_converter(type(row))
+    return converter(row)
@@ -0,0 +1,79 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """One in-flight execution and the callers waiting on it"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution
+
+    The first caller for a key runs the function; callers that arrive while it is still
+    running block until it finishes and receive the same result (or the same exception).
+    Nothing is remembered once the call completes, so a later caller runs it again.
+
+    Usage:
+        flight = SingleFlight()
+        rows = flight.do(("all", sql, params_key), lambda: run_query(sql, params))
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn` unless an identical call is already in flight, then share its outcome
+
+        Args:
+            key: Identity of the call (e.g. exact SQL text and parameters)
+            fn: Zero-argument function producing the result
+
+        Returns:
+            The result of `fn`, computed by this caller or by the one already in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.executed += 1
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Executions vs. callers that piggybacked on an execution already in flight"""
+        with self._lock:
+            return {'executed': self.executed, 'shared': self.shared, 'in_flight': len(self._calls)}
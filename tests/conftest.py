@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# main.py builds its engine at import time: point it at a throwaway SQLite3 file first
+_DB_DIR = tempfile.mkdtemp(prefix='db-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.pop('DB_PREPARED_STATEMENTS', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def main_module():
+    import main
+    main.clear_count_cache()
+    yield main
+    main.disable_result_cache()
+    main.disable_single_flight()
+    main.clear_count_cache()
+
+
+@pytest.fixture(scope='session')
+def numbers_table():
+    """numbers(n) holding 1..25"""
+    import main
+    from sqlalchemy import text
+    with main.engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS numbers"))
+        conn.execute(text("CREATE TABLE numbers (n INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO numbers (n) VALUES (:n)"), [{'n': n} for n in range(1, 26)])
+    return 'numbers'
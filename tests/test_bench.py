@@ -0,0 +1,23 @@
+import math
+import pytest
+from bench import measure, quantile_ci, summarize
+
+
+def test_measure_rejects_zero_iterations():
+    with pytest.raises(ValueError):
+        measure('noop', lambda timer: None, iterations=0, warmup=0)
+
+
+def test_measure_records_extra_from_last_iteration():
+    def body(timer):
+        with timer.phase('work'):
+            timer.extra['rows'] = 3
+
+    result = measure('rows', body, iterations=2, warmup=0)
+    assert result['extra']['rows'] == 3
+    assert result['phases']['work']['n'] == 2
+
+
+def test_empty_samples_summarize_to_nan():
+    assert all(math.isnan(v) for v in quantile_ci([], 0.5).values())
+    assert summarize([])['n'] == 0
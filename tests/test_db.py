@@ -0,0 +1,12 @@
+from db import copy_text_value, rows_to_copy_buffer
+
+
+def test_copy_text_value_escapes_copy_specials():
+    assert copy_text_value(None) == "\\N"
+    assert copy_text_value("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+    assert copy_text_value(1.5) == "1.5"
+
+
+def test_rows_to_copy_buffer_is_rewound():
+    buffer = rows_to_copy_buffer([(1, None, "x\ty"), (2, "z", None)])
+    assert buffer.read() == "1\t\\N\tx\\ty\n2\tz\t\\N\n"
@@ -0,0 +1,23 @@
+import os
+import importlib.util
+
+_spec = importlib.util.spec_from_file_location(
+    'index_advisor', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'index-advisor.py'))
+index_advisor = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(index_advisor)
+
+
+def test_candidate_names_include_sort_direction():
+    ascending = index_advisor.Candidate('asset_master', ('timestamp',))
+    descending = index_advisor.Candidate('asset_master', ('timestamp DESC',))
+    explicit_asc = index_advisor.Candidate('asset_master', ('timestamp ASC',))
+    assert ascending.name != descending.name
+    assert ascending.name == explicit_asc.name
+    assert descending.name == 'idx_asset_master_timestamp_desc'
+
+
+def test_long_candidate_names_stay_distinct_within_63_bytes():
+    first = index_advisor.Candidate('asset_total_history_report', ('asset_name', 'timestamp', 'total DESC'))
+    second = index_advisor.Candidate('asset_total_history_report', ('asset_name', 'timestamp', 'total'))
+    assert len(first.name) <= 63 and len(second.name) <= 63
+    assert first.name != second.name
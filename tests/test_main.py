@@ -0,0 +1,37 @@
+def test_result_cache_keeps_queries_that_differ_inside_a_literal_apart(main_module):
+    main_module.enable_result_cache()
+
+    assert main_module.fetch_all("SELECT 'a  b' AS v") == [{'v': 'a  b'}]
+    assert main_module.fetch_all("SELECT 'a b' AS v") == [{'v': 'a b'}]
+    assert main_module.fetch_one("SELECT 'a b' AS v") == {'v': 'a b'}
+
+
+def test_count_cache_keeps_queries_that_differ_inside_a_literal_apart(main_module):
+    two_spaces = "SELECT COUNT(*) AS count FROM (SELECT 1 WHERE 'a  b' = 'a  b') AS subquery"
+    one_space = "SELECT COUNT(*) AS count FROM (SELECT 1 WHERE 'a b' = 'a  b') AS subquery"
+
+    assert main_module.cached_count(two_spaces) == 1
+    assert main_module.cached_count(one_space) == 0
+
+
+def test_single_flight_keeps_queries_that_differ_inside_a_literal_apart(main_module, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    main_module.enable_single_flight()
+    # Both loads must be in flight at once: if the second call were coalesced into the
+    # first, it would never reach the barrier and the barrier would break
+    barrier = threading.Barrier(2, timeout=5)
+    fetch_all = main_module._fetch_all
+
+    def slow_fetch_all(query, params, row_format):
+        barrier.wait()
+        return fetch_all(query, params, row_format)
+
+    monkeypatch.setattr(main_module, '_fetch_all', slow_fetch_all)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        two_spaces = executor.submit(main_module.fetch_all, "SELECT 'a  b' AS v")
+        one_space = executor.submit(main_module.fetch_all, "SELECT 'a b' AS v")
+        assert two_spaces.result() == [{'v': 'a  b'}]
+        assert one_space.result() == [{'v': 'a b'}]
+    assert main_module.single_flight.stats()['shared'] == 0
@@ -0,0 +1,42 @@
+import pytest
+from paging import _split_order_by, query_key, window_page_query
+
+COMMENTED_QUERIES = [
+    "SELECT n FROM numbers -- all rows",
+    "SELECT n -- the value\nFROM numbers\n/* order by n is moved */\nORDER BY n DESC -- newest first\n;",
+]
+
+
+def test_query_key_keeps_literal_whitespace():
+    assert query_key("SELECT 'a  b' AS v;") == "SELECT 'a  b' AS v"
+    assert query_key("SELECT 'a  b' AS v") != query_key("SELECT 'a b' AS v")
+
+
+def test_split_order_by_skips_comments_literals_and_subqueries():
+    query = ("SELECT n, 'order by x' AS s, (SELECT max(n) FROM numbers ORDER BY 1) AS m FROM numbers "
+             "-- order by s\n/* ORDER BY m */ ORDER BY n DESC -- newest first")
+    body, order_by = _split_order_by(query)
+    assert order_by == "n DESC -- newest first"
+    assert body.endswith("/* ORDER BY m */")
+    assert _split_order_by("SELECT n FROM numbers -- order by n") == ("SELECT n FROM numbers -- order by n", None)
+
+
+def test_window_page_query_wraps_commented_query_on_its_own_lines():
+    sql = window_page_query("SELECT n FROM numbers -- all rows", 10, 20)
+    assert "-- all rows\n) AS subquery" in sql
+    assert sql.endswith("\nLIMIT 10 OFFSET 20")
+
+
+@pytest.mark.parametrize('query', COMMENTED_QUERIES)
+@pytest.mark.parametrize('count_strategy', ['exact', 'estimate', 'cached', 'window'])
+def test_paginate_commented_query(main_module, numbers_table, query, count_strategy):
+    page = main_module.paginate_query(query, page=2, per_page=10, count_strategy=count_strategy,
+                                      row_format='tuple', use_cache=False)
+    expected = range(15, 5, -1) if 'DESC' in query else range(11, 21)
+    assert page.items == [(n,) for n in expected]
+    assert (page.total, page.total_pages) == (25, 3)
+
+
+def test_window_past_last_page_falls_back_to_count(main_module, numbers_table):
+    page = main_module.paginate_query(COMMENTED_QUERIES[0], page=9, per_page=10, count_strategy='window')
+    assert page.items == [] and page.total == 25